@@ -0,0 +1,186 @@
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from starlette import status
+from cache import LRUTTLCache
+import asyncio
+import math
+import time
+import os
+from dotenv import load_dotenv
+
+# charge les variables d'environnement
+load_dotenv()
+
+# budgets par classe de route: requêtes en cours max (0 = illimité), file d'attente max, attente max (s)
+ADMISSION_AUTH_LIMIT = int(os.getenv("ADMISSION_AUTH_LIMIT","8"))
+ADMISSION_AUTH_QUEUE = int(os.getenv("ADMISSION_AUTH_QUEUE","32"))
+ADMISSION_AUTH_MAX_WAIT = float(os.getenv("ADMISSION_AUTH_MAX_WAIT","2"))
+ADMISSION_BULK_LIMIT = int(os.getenv("ADMISSION_BULK_LIMIT","4"))
+ADMISSION_BULK_QUEUE = int(os.getenv("ADMISSION_BULK_QUEUE","32"))
+ADMISSION_BULK_MAX_WAIT = float(os.getenv("ADMISSION_BULK_MAX_WAIT","5"))
+ADMISSION_CRUD_LIMIT = int(os.getenv("ADMISSION_CRUD_LIMIT","64"))
+ADMISSION_CRUD_QUEUE = int(os.getenv("ADMISSION_CRUD_QUEUE","256"))
+ADMISSION_CRUD_MAX_WAIT = float(os.getenv("ADMISSION_CRUD_MAX_WAIT","1"))
+
+# seaux de jetons du login: capacité et jetons rendus par seconde, par IP et par username
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST","20"))
+LOGIN_IP_RATE = float(os.getenv("LOGIN_IP_RATE","1"))
+LOGIN_USERNAME_BURST = int(os.getenv("LOGIN_USERNAME_BURST","5"))
+LOGIN_USERNAME_RATE = float(os.getenv("LOGIN_USERNAME_RATE","0.1"))
+LOGIN_BUCKETS_MAXSIZE = int(os.getenv("LOGIN_BUCKETS_MAXSIZE","100000"))
+
+# routes jamais limitées (sondes et scraper)
+EXEMPT_PATHS = ("/healthz","/readyz","/metrics")
+
+# routes admin légères (diagnostic, suppression unitaire) comptées avec le crud pour rester accessibles sous charge
+ADMIN_LIGHT_PATHS = ("/admin/pool","/admin/cache")
+
+
+# budget de concurrence d'une classe de route avec file d'attente bornée
+class AdmissionBudget:
+
+    def __init__(self,name:str,limit:int,queue:int,max_wait:float):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.max_wait = max_wait
+        self.slots = asyncio.Semaphore(limit) if limit else None
+        self.active = 0
+        self.waiting = 0
+        self.shed = {"queue_full":0,"timeout":0}
+
+    # prend une place, renvoie la raison du rejet (queue_full, timeout) ou None si la requête est admise
+    # capacité = places + file: un waiter réveillé mais pas encore repris compte encore dans waiting,
+    # la somme active+waiting reste donc juste (locked() reste vrai tant qu'il existe un waiter)
+    async def acquire(self):
+        if self.slots is None:
+            self.active += 1
+            return None
+        if self.active+self.waiting >= self.limit+self.queue:
+            self.shed["queue_full"] += 1
+            return "queue_full"
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.slots.acquire(),timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self.shed["timeout"] += 1
+            return "timeout"
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return None
+
+    def release(self):
+        self.active -= 1
+        if self.slots is not None:
+            self.slots.release()
+
+    def stats(self):
+        return {"limit":self.limit,"active":self.active,"waiting":self.waiting,"shed":dict(self.shed)}
+
+
+budgets = {
+    "auth":AdmissionBudget("auth",ADMISSION_AUTH_LIMIT,ADMISSION_AUTH_QUEUE,ADMISSION_AUTH_MAX_WAIT),
+    "bulk":AdmissionBudget("bulk",ADMISSION_BULK_LIMIT,ADMISSION_BULK_QUEUE,ADMISSION_BULK_MAX_WAIT),
+    "crud":AdmissionBudget("crud",ADMISSION_CRUD_LIMIT,ADMISSION_CRUD_QUEUE,ADMISSION_CRUD_MAX_WAIT)
+}
+
+# classe d'une requête d'après son chemin (None = exemptée)
+# auth: bcrypt (login, register), bulk: lectures/écritures de masse (admin, batch), crud: le reste
+def route_class(path:str):
+    if path in EXEMPT_PATHS:
+        return None
+    if path in ("/auth/login","/auth/register"):
+        return "auth"
+    if path in ADMIN_LIGHT_PATHS or path.startswith("/admin/delete/"):
+        return "crud"
+    if path.startswith("/admin/") or path.startswith("/player/batch/"):
+        return "bulk"
+    return "crud"
+
+
+# middleware ASGI: une classe saturée est rejetée en 503 + Retry-After sans ralentir les autres
+# la place est gardée jusqu'à la fin de la réponse (un export en flux reste compté)
+class AdmissionMiddleware:
+
+    def __init__(self,app):
+        self.app = app
+
+    async def __call__(self,scope,receive,send):
+        name = route_class(scope["path"]) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope,receive,send)
+            return
+        budget = budgets[name]
+        rejected = await budget.acquire()
+        if rejected is not None:
+            response = ORJSONResponse(
+                {"detail":"serveur surchargé, réessayez plus tard"},
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After":str(max(1,math.ceil(budget.max_wait)))}
+            )
+            await response(scope,receive,send)
+            return
+        try:
+            await self.app(scope,receive,send)
+        finally:
+            budget.release()
+
+
+# seaux de jetons en mémoire (par worker), bornés en nombre de clés
+# une clé absente équivaut à un seau plein: l'entrée expire quand il serait de nouveau plein
+class TokenBuckets:
+
+    def __init__(self,burst:int,rate:float,maxsize:int=LOGIN_BUCKETS_MAXSIZE):
+        self.burst = burst
+        self.rate = rate
+        self.buckets = LRUTTLCache(maxsize,ttl=burst/rate if rate else math.inf)
+        self.rejected = 0
+
+    def _level(self,key):
+        now = time.monotonic()
+        tokens,updated = self.buckets.get(key,(self.burst,now))
+        return min(self.burst,tokens+(now-updated)*self.rate),now
+
+    # prend un jeton, renvoie 0 si accepté sinon le nombre de secondes avant le prochain jeton
+    def take(self,key):
+        tokens,now = self._level(key)
+        if tokens < 1:
+            self.rejected += 1
+            return (1-tokens)/self.rate if self.rate else math.inf
+        self.buckets.set(key,(tokens-1,now),ttl=(self.burst-tokens+1)/self.rate if self.rate else None)
+        return 0
+
+    # rend un jeton (tentative réussie: seuls les échecs consomment le budget)
+    def give_back(self,key):
+        tokens,now = self._level(key)
+        self.buckets.set(key,(min(self.burst,tokens+1),now),ttl=(self.burst-min(self.burst,tokens+1))/self.rate if self.rate else None)
+
+
+# limite le travail bcrypt des tentatives de login par IP et par username
+class LoginRateLimiter:
+
+    def __init__(self):
+        self.by_ip = TokenBuckets(LOGIN_IP_BURST,LOGIN_IP_RATE)
+        self.by_username = TokenBuckets(LOGIN_USERNAME_BURST,LOGIN_USERNAME_RATE)
+
+    # à appeler avant toute vérification de mot de passe, 429 + Retry-After si un seau est vide
+    def check(self,ip:str,username:str):
+        username = username.lower()
+        wait = self.by_ip.take(ip)
+        if not wait:
+            wait = self.by_username.take(username)
+            if wait:
+                self.by_ip.give_back(ip)
+        if wait:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,detail="trop de tentatives de connexion, réessayez plus tard",headers={"Retry-After":str(max(1,math.ceil(min(wait,3600))))})
+
+    def succeeded(self,ip:str,username:str):
+        self.by_ip.give_back(ip)
+        self.by_username.give_back(username.lower())
+
+    def stats(self):
+        return {"rejected_ip":self.by_ip.rejected,"rejected_username":self.by_username.rejected}
+
+
+login_limiter = LoginRateLimiter()
@@ -3,6 +3,7 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 import models
+import database
 from alembic import context
 
 # this is the Alembic Config object, which provides
@@ -14,6 +15,10 @@ config = context.config
 
 fileConfig(config.config_file_name)
 
+# utilise la même base que l'application quand DATABASE_URL est défini
+if database.SQLALCHEMY_DATABASE_URI:
+    config.set_main_option("sqlalchemy.url", database.SQLALCHEMY_DATABASE_URI.replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
@@ -0,0 +1,90 @@
+"""add level counts
+
+Revision ID: 11042a9fd246
+Revises: 6299e9573523
+Create Date: 2026-10-17 09:41:07.318256
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '11042a9fd246'
+down_revision: Union[str, Sequence[str], None] = '6299e9573523'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# delta net par (classe, niveau) d'une instruction, appliqué en un seul upsert trié (même principe que trophy_counts)
+# niveau NULL est compté sous 0: les niveaux valides vont de 1 à 100 et NULL est classé en dernier
+APPLY_DELTAS = """
+    INSERT INTO level_counts (classe, niveau, players)
+    SELECT classe, niveau, sum(delta) FROM ({rows}) AS moved
+    GROUP BY classe, niveau HAVING sum(delta) <> 0
+    ORDER BY classe, niveau
+    ON CONFLICT (classe, niveau) DO UPDATE SET players = level_counts.players + EXCLUDED.players;
+"""
+NEW_ROWS = "SELECT classe, coalesce(niveau, 0) AS niveau, 1 AS delta FROM new_rows"
+OLD_ROWS = "SELECT classe, coalesce(niveau, 0) AS niveau, -1 AS delta FROM old_rows"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # nombre de joueurs par classe et niveau: quelques centaines de lignes lues pour calculer un rang
+    op.create_table(
+        'level_counts',
+        sa.Column('classe', sa.String(), nullable=False),
+        sa.Column('niveau', sa.Integer(), nullable=False),
+        sa.Column('players', sa.BigInteger(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('classe', 'niveau'),
+    )
+
+    op.execute(f"""
+        CREATE FUNCTION update_level_counts() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {APPLY_DELTAS.format(rows=NEW_ROWS)}
+            ELSIF TG_OP = 'UPDATE' THEN
+                {APPLY_DELTAS.format(rows=NEW_ROWS+" UNION ALL "+OLD_ROWS)}
+            ELSE
+                {APPLY_DELTAS.format(rows=OLD_ROWS)}
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    # les tables de transition n'acceptent qu'un événement par trigger
+    op.execute("""
+        CREATE TRIGGER players_level_counts_insert AFTER INSERT ON "Players"
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION update_level_counts()
+    """)
+    op.execute("""
+        CREATE TRIGGER players_level_counts_update AFTER UPDATE ON "Players"
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION update_level_counts()
+    """)
+    op.execute("""
+        CREATE TRIGGER players_level_counts_delete AFTER DELETE ON "Players"
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION update_level_counts()
+    """)
+
+    # initialise les compteurs avec les joueurs existants
+    op.execute("""
+        INSERT INTO level_counts (classe, niveau, players)
+        SELECT classe, coalesce(niveau, 0), count(*) FROM "Players"
+        GROUP BY classe, coalesce(niveau, 0)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER players_level_counts_delete ON "Players"')
+    op.execute('DROP TRIGGER players_level_counts_update ON "Players"')
+    op.execute('DROP TRIGGER players_level_counts_insert ON "Players"')
+    op.execute('DROP FUNCTION update_level_counts()')
+    op.drop_table('level_counts')
@@ -0,0 +1,68 @@
+"""create users and players tables
+
+Revision ID: 12884a43b0d5
+Revises: 
+Create Date: 2026-10-16 10:02:17.554890
+
+Bases créées par create_all au démarrage (avant le passage à Alembic seul), sans ligne alembic_version:
+leurs tables correspondent déjà à 4c1c2ef28185. Les marquer une fois avant de migrer:
+
+    alembic stamp 4c1c2ef28185
+    alembic upgrade head
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '12884a43b0d5'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # tables créées jusqu'ici par create_all au démarrage, désormais par Alembic
+    # (les bases existantes sont déjà au-delà de cette révision et ne la rejouent pas)
+    if not op.get_context().as_sql and sa.inspect(op.get_bind()).has_table('Users'):
+        raise RuntimeError(
+            'les tables "Users"/"Players" existent déjà (base créée par create_all): '
+            'lancer "alembic stamp 4c1c2ef28185" puis "alembic upgrade head"'
+        )
+    op.create_table(
+        'Users',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('nom', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('username', sa.String(), nullable=False),
+        sa.Column('hashed_password', sa.String(), nullable=False),
+        sa.Column('role', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('username'),
+    )
+    op.create_index(op.f('ix_Users_id'), 'Users', ['id'], unique=False)
+
+    # owner_id est ajouté par la révision suivante
+    op.create_table(
+        'Players',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('nom', sa.String(), nullable=False),
+        sa.Column('classe', sa.String(), nullable=False),
+        sa.Column('niveau', sa.Integer(), nullable=True),
+        sa.Column('trophe', sa.ARRAY(sa.String()), nullable=False),
+        sa.Column('actif', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_Players_id'), 'Players', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_Players_id'), table_name='Players')
+    op.drop_table('Players')
+    op.drop_index(op.f('ix_Users_id'), table_name='Users')
+    op.drop_table('Users')
@@ -0,0 +1,68 @@
+"""add players_version to users
+
+Revision ID: 26193f580c26
+Revises: d633b404d33a
+Create Date: 2026-10-16 11:18:52.940316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '26193f580c26'
+down_revision: Union[str, Sequence[str], None] = 'd633b404d33a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # compteur de version des joueurs de chaque propriétaire (sert aux ETags)
+    op.add_column('Users', sa.Column('players_version', sa.BigInteger(), server_default='0', nullable=False))
+
+    # incrémente la version des propriétaires touchés, une fois par instruction (batch compris)
+    op.execute("""
+        CREATE FUNCTION bump_players_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE "Users" SET players_version = players_version + 1
+                WHERE id IN (SELECT owner_id FROM new_rows);
+            ELSIF TG_OP = 'UPDATE' THEN
+                UPDATE "Users" SET players_version = players_version + 1
+                WHERE id IN (SELECT owner_id FROM new_rows UNION SELECT owner_id FROM old_rows);
+            ELSE
+                UPDATE "Users" SET players_version = players_version + 1
+                WHERE id IN (SELECT owner_id FROM old_rows);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    # les tables de transition n'acceptent qu'un événement par trigger
+    op.execute("""
+        CREATE TRIGGER players_version_insert AFTER INSERT ON "Players"
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_players_version()
+    """)
+    op.execute("""
+        CREATE TRIGGER players_version_update AFTER UPDATE ON "Players"
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_players_version()
+    """)
+    op.execute("""
+        CREATE TRIGGER players_version_delete AFTER DELETE ON "Players"
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_players_version()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER players_version_delete ON "Players"')
+    op.execute('DROP TRIGGER players_version_update ON "Players"')
+    op.execute('DROP TRIGGER players_version_insert ON "Players"')
+    op.execute('DROP FUNCTION bump_players_version()')
+    op.drop_column('Users', 'players_version')
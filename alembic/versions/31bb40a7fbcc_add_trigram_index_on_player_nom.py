@@ -0,0 +1,42 @@
+"""add trigram index on player nom
+
+Revision ID: 31bb40a7fbcc
+Revises: 4c1c2ef28185
+Create Date: 2026-10-16 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '31bb40a7fbcc'
+down_revision: Union[str, Sequence[str], None] = '4c1c2ef28185'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # active l'extension trigramme (similarity, opérateur %)
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # index GIN trigramme sur nom, créé sans verrouiller la table en écriture
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_players_nom_trgm',
+            'Players',
+            ['nom'],
+            postgresql_using='gin',
+            postgresql_ops={'nom': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # supprime l'index trigramme (l'extension est laissée en place)
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_players_nom_trgm', table_name='Players', postgresql_concurrently=True)
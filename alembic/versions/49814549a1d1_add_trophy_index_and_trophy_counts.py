@@ -0,0 +1,80 @@
+"""add trophy index and trophy counts
+
+Revision ID: 49814549a1d1
+Revises: e2f150bbb5fc
+Create Date: 2026-10-16 13:04:48.672215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '49814549a1d1'
+down_revision: Union[str, Sequence[str], None] = 'e2f150bbb5fc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # nombre de détenteurs par trophée, tenu à jour par trigger (lecture par clé primaire)
+    op.create_table(
+        'trophy_counts',
+        sa.Column('trophe', sa.String(), nullable=False),
+        sa.Column('holders', sa.BigInteger(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('trophe'),
+    )
+    op.create_index('ix_trophy_counts_holders', 'trophy_counts', [sa.text('holders DESC')])
+
+    # un joueur compte une fois par trophée, même s'il l'a en double dans son tableau
+    op.execute("""
+        CREATE FUNCTION update_trophy_counts() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE trophy_counts SET holders = holders - 1
+                WHERE trophe IN (SELECT unnest(OLD.trophe));
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO trophy_counts (trophe, holders)
+                SELECT DISTINCT unnest(NEW.trophe), 1
+                ON CONFLICT (trophe) DO UPDATE SET holders = trophy_counts.holders + 1;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER players_trophy_counts
+        AFTER INSERT OR DELETE OR UPDATE OF trophe ON "Players"
+        FOR EACH ROW EXECUTE FUNCTION update_trophy_counts()
+    """)
+
+    # initialise les compteurs avec les joueurs existants
+    op.execute("""
+        INSERT INTO trophy_counts (trophe, holders)
+        SELECT trophe, count(*) FROM (SELECT DISTINCT id, unnest(trophe) AS trophe FROM "Players") AS held
+        GROUP BY trophe
+    """)
+
+    # index GIN pour les filtres contient-un (&&) et contient-tous (@>)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_players_trophe_gin',
+            'Players',
+            ['trophe'],
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_players_trophe_gin', table_name='Players', postgresql_concurrently=True)
+    op.execute('DROP TRIGGER players_trophy_counts ON "Players"')
+    op.execute('DROP FUNCTION update_trophy_counts()')
+    op.drop_index('ix_trophy_counts_holders', table_name='trophy_counts')
+    op.drop_table('trophy_counts')
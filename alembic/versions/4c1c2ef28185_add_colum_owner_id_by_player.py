@@ -1,7 +1,7 @@
 """add colum  owner_id by player
 
 Revision ID: 4c1c2ef28185
-Revises: 
+Revises: 12884a43b0d5
 Create Date: 2026-01-22 09:06:00.761138
 
 """
@@ -13,7 +13,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision: str = '4c1c2ef28185'
-down_revision: Union[str, Sequence[str], None] = None
+down_revision: Union[str, Sequence[str], None] = '12884a43b0d5'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
@@ -0,0 +1,99 @@
+"""trophy counts statement triggers
+
+Revision ID: 6299e9573523
+Revises: 49814549a1d1
+Create Date: 2026-10-16 15:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6299e9573523'
+down_revision: Union[str, Sequence[str], None] = '49814549a1d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# delta net par trophée d'une instruction (un joueur compte une fois par trophée), appliqué en un seul upsert
+# trié par trophée: les verrous sont toujours pris dans le même ordre, et un delta nul ne verrouille rien
+APPLY_DELTAS = """
+    INSERT INTO trophy_counts (trophe, holders)
+    SELECT trophe, sum(delta) FROM ({held}) AS held
+    GROUP BY trophe HAVING sum(delta) <> 0
+    ORDER BY trophe
+    ON CONFLICT (trophe) DO UPDATE SET holders = trophy_counts.holders + EXCLUDED.holders;
+"""
+NEW_HELD = "SELECT DISTINCT id, unnest(trophe) AS trophe, 1 AS delta FROM new_rows"
+OLD_HELD = "SELECT DISTINCT id, unnest(trophe) AS trophe, -1 AS delta FROM old_rows"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # remplace le trigger par ligne (verrous pris dans l'ordre des lignes, risque d'interblocage)
+    op.execute('DROP TRIGGER players_trophy_counts ON "Players"')
+    op.execute('DROP FUNCTION update_trophy_counts()')
+
+    op.execute(f"""
+        CREATE FUNCTION update_trophy_counts() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {APPLY_DELTAS.format(held=NEW_HELD)}
+            ELSIF TG_OP = 'UPDATE' THEN
+                {APPLY_DELTAS.format(held=NEW_HELD+" UNION ALL "+OLD_HELD)}
+            ELSE
+                {APPLY_DELTAS.format(held=OLD_HELD)}
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    # les tables de transition n'acceptent qu'un événement par trigger
+    op.execute("""
+        CREATE TRIGGER players_trophy_counts_insert AFTER INSERT ON "Players"
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION update_trophy_counts()
+    """)
+    op.execute("""
+        CREATE TRIGGER players_trophy_counts_update AFTER UPDATE ON "Players"
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION update_trophy_counts()
+    """)
+    op.execute("""
+        CREATE TRIGGER players_trophy_counts_delete AFTER DELETE ON "Players"
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION update_trophy_counts()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER players_trophy_counts_delete ON "Players"')
+    op.execute('DROP TRIGGER players_trophy_counts_update ON "Players"')
+    op.execute('DROP TRIGGER players_trophy_counts_insert ON "Players"')
+    op.execute('DROP FUNCTION update_trophy_counts()')
+
+    op.execute("""
+        CREATE FUNCTION update_trophy_counts() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE trophy_counts SET holders = holders - 1
+                WHERE trophe IN (SELECT unnest(OLD.trophe));
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO trophy_counts (trophe, holders)
+                SELECT DISTINCT unnest(NEW.trophe), 1
+                ON CONFLICT (trophe) DO UPDATE SET holders = trophy_counts.holders + 1;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER players_trophy_counts
+        AFTER INSERT OR DELETE OR UPDATE OF trophe ON "Players"
+        FOR EACH ROW EXECUTE FUNCTION update_trophy_counts()
+    """)
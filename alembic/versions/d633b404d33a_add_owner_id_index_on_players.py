@@ -0,0 +1,36 @@
+"""add owner_id index on players
+
+Revision ID: d633b404d33a
+Revises: 31bb40a7fbcc
+Create Date: 2026-10-16 10:41:05.206733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd633b404d33a'
+down_revision: Union[str, Sequence[str], None] = '31bb40a7fbcc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # (owner_id, id): filtre par propriétaire + tri/curseur sur id (listes, export par owner, FK)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_players_owner_id_id',
+            'Players',
+            ['owner_id', 'id'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_players_owner_id_id', table_name='Players', postgresql_concurrently=True)
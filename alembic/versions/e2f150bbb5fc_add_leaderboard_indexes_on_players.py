@@ -0,0 +1,44 @@
+"""add leaderboard indexes on players
+
+Revision ID: e2f150bbb5fc
+Revises: 26193f580c26
+Create Date: 2026-10-16 11:57:30.118472
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f150bbb5fc'
+down_revision: Union[str, Sequence[str], None] = '26193f580c26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # classement maintenu par Postgres à chaque écriture: niveau, puis nombre de trophées, puis id
+    # le top N est une lecture d'index, le rang d'un joueur un comptage sur une plage d'index
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_players_leaderboard',
+            'Players',
+            [sa.text('niveau DESC NULLS LAST'), sa.text('cardinality(trophe) DESC'), 'id'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_players_leaderboard_classe',
+            'Players',
+            ['classe', sa.text('niveau DESC NULLS LAST'), sa.text('cardinality(trophe) DESC'), 'id'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_players_leaderboard_classe', table_name='Players', postgresql_concurrently=True)
+        op.drop_index('ix_players_leaderboard', table_name='Players', postgresql_concurrently=True)
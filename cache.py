@@ -0,0 +1,158 @@
+from collections import OrderedDict
+from abc import ABC,abstractmethod
+import time
+import os
+from dotenv import load_dotenv
+
+# charge les variables d'environnement
+load_dotenv()
+
+# config du cache des joueurs
+PLAYER_CACHE_MAXSIZE = int(os.getenv("PLAYER_CACHE_MAXSIZE","10000"))
+PLAYER_CACHE_TTL = float(os.getenv("PLAYER_CACHE_TTL","30"))
+
+
+# cache LRU en mémoire avec expiration par entrée
+class LRUTTLCache:
+
+    def __init__(self,maxsize:int,ttl:float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    # renvoie la valeur (ou default si absente ou expirée) et la marque comme récemment utilisée
+    def get(self,key,default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        value,expires_at = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return default
+        self.entries.move_to_end(key)
+        return value
+
+    # ajoute une valeur, ttl en secondes (ttl du cache par défaut), évince la moins récente si plein
+    def set(self,key,value,ttl:float|None=None):
+        self.entries[key] = (value,time.monotonic()+(self.ttl if ttl is None else ttl))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def delete(self,key):
+        self.entries.pop(key,None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# interface d'un backend de cache, à implémenter pour un stockage externe partagé entre workers (Redis, memcached...)
+# classe abstraite: un backend incomplet échoue dès sa création, pas à la première lecture
+class CacheBackend(ABC):
+
+    @abstractmethod
+    async def get(self,key:str):
+        ...
+
+    @abstractmethod
+    async def set(self,key:str,value,ttl:float):
+        ...
+
+    # compteur persistant (jamais évincé), 0 s'il n'existe pas
+    @abstractmethod
+    async def counter(self,key:str) -> int:
+        ...
+
+    @abstractmethod
+    async def incr(self,key:str) -> int:
+        ...
+
+    def size(self) -> int | None:
+        return None
+
+
+# backend par défaut: en mémoire, propre à chaque worker
+class MemoryCacheBackend(CacheBackend):
+
+    def __init__(self,maxsize:int=PLAYER_CACHE_MAXSIZE,ttl:float=PLAYER_CACHE_TTL):
+        self.entries = LRUTTLCache(maxsize,ttl)
+        # les compteurs sont hors LRU: une éviction remettrait une génération à zéro et ressusciterait des entrées périmées
+        self.counters = {}
+
+    async def get(self,key:str):
+        return self.entries.get(key)
+
+    async def set(self,key:str,value,ttl:float):
+        self.entries.set(key,value,ttl)
+
+    async def counter(self,key:str) -> int:
+        return self.counters.get(key,0)
+
+    async def incr(self,key:str) -> int:
+        self.counters[key] = self.counters.get(key,0)+1
+        return self.counters[key]
+
+    def size(self) -> int | None:
+        return len(self.entries)
+
+
+# cache read-through des lectures de joueurs par propriétaire
+# chaque clé contient la génération du propriétaire: une écriture incrémente la génération
+# et rend d'un coup toutes ses entrées (liste et joueurs) inaccessibles, sans course lecture/écriture
+class PlayerCache:
+
+    def __init__(self,backend:CacheBackend,ttl:float=PLAYER_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.listeners = []
+
+    # remplace le backend (par exemple par un stockage externe au démarrage)
+    def use_backend(self,backend:CacheBackend):
+        self.backend = backend
+
+    async def _key(self,owner_id:int,parts:tuple):
+        generation = await self.backend.counter(f"players:gen:{owner_id}")
+        return ":".join(str(part) for part in ("players",owner_id,generation,*parts))
+
+    # renvoie la valeur en cache ou appelle loader (coroutine) et met le résultat en cache (None n'est pas mis en cache)
+    async def get_or_load(self,owner_id:int,parts:tuple,loader):
+        key = await self._key(owner_id,parts)
+        value = await self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = await loader()
+        if value is not None:
+            await self.backend.set(key,value,self.ttl)
+        return value
+
+    # invalide toutes les entrées des propriétaires donnés, à appeler après chaque écriture de joueurs
+    async def invalidate(self,*owner_ids:int):
+        for owner_id in set(owner_ids):
+            await self.backend.incr(f"players:gen:{owner_id}")
+        for listener in self.listeners:
+            listener(owner_ids)
+
+    # enregistre une fonction appelée à chaque invalidation (caches dérivés des joueurs: classements...)
+    def on_invalidate(self,listener):
+        self.listeners.append(listener)
+
+    def stats(self):
+        lookups = self.hits+self.misses
+        return {
+            "backend":type(self.backend).__name__,
+            "hits":self.hits,
+            "misses":self.misses,
+            "hit_ratio":self.hits/lookups if lookups else 0.0,
+            "size":self.backend.size()
+        }
+
+
+# instance partagée par les routeurs
+player_cache = PlayerCache(MemoryCacheBackend())
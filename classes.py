@@ -1,5 +1,20 @@
 from pydantic import BaseModel, Field, field_validator,EmailStr
-from typing import List
+from typing import List,Optional
+
+# classes de joueur autorisées
+CLASSES_AUTORISEES = ['guerrier', 'mage', 'archer', 'voleur']
+
+# règles partagées par la création, la mise à jour complète et partielle
+def verifier_classe(value):
+    if value.lower() not in CLASSES_AUTORISEES:
+        raise ValueError(f'La classe doit être parmi: {", ".join(CLASSES_AUTORISEES)}')
+    return value.lower()
+
+def verifier_trophe(value):
+    if len(value) > 10:
+        raise ValueError('Un joueur ne peut pas avoir plus de 10 trophées')
+    return value
+
 
 class PlayerValidation(BaseModel):
     
@@ -14,18 +29,13 @@ class PlayerValidation(BaseModel):
     @field_validator('classe')
     @classmethod
     def valider_classe(cls, value):
-        classes_autorisees = ['guerrier', 'mage', 'archer', 'voleur']
-        if value.lower() not in classes_autorisees:
-            raise ValueError(f'La classe doit être parmi: {", ".join(classes_autorisees)}')
-        return value.lower()
+        return verifier_classe(value)
     
     # validation personnalisée pour les trophées
     @field_validator('trophe')
     @classmethod
     def valider_trophe(cls, value):
-        if len(value) > 10:
-            raise ValueError('Un joueur ne peut pas avoir plus de 10 trophées')
-        return value
+        return verifier_trophe(value)
     
     class Config:
         json_schema_extra = {
@@ -39,6 +49,84 @@ class PlayerValidation(BaseModel):
         }
 
 
+class PlayerBatchUpdate(PlayerValidation):
+
+    id: int = Field(ge=1)
+
+
+# mise à jour partielle: seuls les champs envoyés sont modifiés
+class PlayerPatch(BaseModel):
+
+    nom: Optional[str] = Field(default=None, min_length=3, max_length=30)
+    classe: Optional[str] = Field(default=None, min_length=3, max_length=20)
+    niveau: Optional[int] = Field(default=None, ge=1, le=100)
+    trophe: Optional[List[str]] = None
+    actif: Optional[bool] = None
+
+    # un champ envoyé ne peut pas être null (les champs absents ne sont pas validés)
+    @field_validator('nom', 'classe', 'niveau', 'trophe', 'actif', mode='before')
+    @classmethod
+    def refuser_null(cls, value):
+        if value is None:
+            raise ValueError('ce champ ne peut pas être null')
+        return value
+
+    @field_validator('classe')
+    @classmethod
+    def valider_classe(cls, value):
+        return verifier_classe(value)
+
+    @field_validator('trophe')
+    @classmethod
+    def valider_trophe(cls, value):
+        return verifier_trophe(value)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "niveau": 6,
+                "actif": False
+            }
+        }
+
+
+class PlayerResponse(BaseModel):
+
+    id: int
+    nom: str
+    classe: str
+    niveau: Optional[int] = None
+    trophe: List[str]
+    actif: Optional[bool] = None
+    owner_id: int
+
+    class Config:
+        from_attributes = True
+
+
+# joueur projeté avec fields=: seules les colonnes demandées sont présentes
+class PlayerFieldsResponse(BaseModel):
+
+    id: int
+    nom: Optional[str] = None
+    classe: Optional[str] = None
+    niveau: Optional[int] = None
+    trophe: Optional[List[str]] = None
+    actif: Optional[bool] = None
+    owner_id: Optional[int] = None
+
+
+class PlayerPage(BaseModel):
+
+    items: List[PlayerFieldsResponse]
+    next_cursor: Optional[int] = None
+
+
+class PlayerSearchResult(PlayerResponse):
+
+    score: Optional[float] = None
+
+
 class UserValidation(BaseModel):
    
     nom: str = Field(min_length=3, max_length=50)
@@ -76,6 +164,18 @@ class UserValidation(BaseModel):
             }
         }
 
+class UserResponse(BaseModel):
+
+    id: int
+    nom: str
+    email: str
+    username: str
+    role: str
+
+    class Config:
+        from_attributes = True
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -1,25 +1,219 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine,event,exc,text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.orm import sessionmaker,Session
+from sqlalchemy.ext.asyncio import create_async_engine,async_sessionmaker,AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from typing import Annotated
 from fastapi import Depends
+import asyncio
+import logging
 import os
+import time
 from dotenv import load_dotenv
 
 # charge les variables d'environnement
 load_dotenv()
 
 
+logger = logging.getLogger("api.database")
+
 # déclare l'URL de la base de données
 
 SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
 
-# déclare le moteur de connexion
+# config du pool de connexions (par worker)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE","5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW","10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT","30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE","1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING","true").lower() in ("1","true","yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS","0"))
+
+# réplicas en lecture (URLs séparées par des virgules, vide = tout sur la base principale)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS","").split(",") if url.strip()]
+
+pool_options = {
+    "pool_size":DB_POOL_SIZE,
+    "max_overflow":DB_MAX_OVERFLOW,
+    "pool_timeout":DB_POOL_TIMEOUT,
+    "pool_recycle":DB_POOL_RECYCLE,
+    "pool_pre_ping":DB_POOL_PRE_PING
+}
+
+# statement_timeout côté serveur (0 = pas de limite), la syntaxe dépend du pilote
+sync_connect_args = {"options":f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"} if DB_STATEMENT_TIMEOUT_MS else {}
+async_connect_args = {"server_settings":{"statement_timeout":str(DB_STATEMENT_TIMEOUT_MS)}} if DB_STATEMENT_TIMEOUT_MS else {}
+
+
+# compteurs du pool asynchrone de ce worker
+class PoolStats:
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.overflow_max = 0
+
+    def record_wait(self,seconds:float):
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max,seconds)
+
+    def as_dict(self):
+        return {
+            "checkouts":self.checkouts,
+            "checkins":self.checkins,
+            "connects":self.connects,
+            "invalidations":self.invalidations,
+            "soft_invalidations":self.soft_invalidations,
+            "timeouts":self.timeouts,
+            "wait_seconds_total":self.wait_seconds_total,
+            "wait_seconds_avg":self.wait_seconds_total/self.checkouts if self.checkouts else 0.0,
+            "wait_seconds_max":self.wait_seconds_max,
+            "overflow_max":self.overflow_max
+        }
+
+pool_stats = PoolStats()
+
+
+# pool asynchrone qui mesure l'attente d'une connexion (aucun événement SQLAlchemy ne marque le début d'un checkout)
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter()-started)
+
+
+# réplica en lecture: son moteur, ses sessions et son dernier état connu
+class Replica:
+
+    def __init__(self,url:str):
+        async_url = make_url(url)
+        if async_url.drivername in ("postgresql","postgresql+psycopg2"):
+            async_url = async_url.set(drivername="postgresql+asyncpg")
+        self.name = f"{async_url.host}:{async_url.port or 5432}/{async_url.database}"
+        self.engine = create_async_engine(async_url,connect_args=async_connect_args,**pool_options)
+        self.sessionlocal = async_sessionmaker(self.engine,autoflush=False,expire_on_commit=False)
+        self.healthy = False
+        self.error = "pas encore vérifiée"
+
+    async def check(self,timeout:float):
+        try:
+            async with self.engine.connect() as connection:
+                await asyncio.wait_for(connection.execute(text("SELECT 1")),timeout=timeout)
+            self.healthy,self.error = True,None
+        except Exception as e:
+            # exposé par /readyz sans authentification: classe de l'erreur seulement, détail dans les logs
+            if self.healthy or self.error != type(e).__name__:
+                logger.warning("réplica %s indisponible: %r",self.name,e)
+            self.healthy,self.error = False,type(e).__name__
+
+
+# moteurs créés au démarrage de l'application (lifespan de main.py) et non à l'import
+engine = None
+async_engine = None
+replicas = []
+
+# déclare la session locale (liée au moteur par init_engines)
+sessionlocal = sessionmaker(autoflush=False,autocommit=False)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URI)
+# déclare la session locale asynchrone (expire_on_commit=False pour lire les objets après commit sans nouvelle requête)
+async_sessionlocal = async_sessionmaker(autoflush=False,expire_on_commit=False)
 
-# déclare la session locale 
-sessionlocal = sessionmaker(autoflush=False,autocommit=False,bind=engine)
+
+# événements du pool asynchrone
+def on_connect(dbapi_connection,connection_record):
+    pool_stats.connects += 1
+
+def on_checkout(dbapi_connection,connection_record,connection_proxy):
+    pool_stats.checkouts += 1
+    pool_stats.overflow_max = max(pool_stats.overflow_max,async_engine.pool.overflow())
+
+def on_checkin(dbapi_connection,connection_record):
+    pool_stats.checkins += 1
+
+def on_invalidate(dbapi_connection,connection_record,exception):
+    pool_stats.invalidations += 1
+
+def on_soft_invalidate(dbapi_connection,connection_record,exception):
+    pool_stats.soft_invalidations += 1
+
+
+# crée les moteurs et lie les sessions (aucune connexion n'est ouverte ici)
+def init_engines():
+    global engine,async_engine
+    if async_engine is not None:
+        return
+    # déclare l'URL asynchrone (même base, pilote asyncpg par défaut)
+    async_database_uri = os.getenv("ASYNC_DATABASE_URL") or make_url(SQLALCHEMY_DATABASE_URI).set(drivername="postgresql+asyncpg")
+
+    # déclare le moteur de connexion
+    engine = create_engine(SQLALCHEMY_DATABASE_URI,connect_args=sync_connect_args,**pool_options)
+
+    # déclare le moteur de connexion asynchrone utilisé par les routeurs
+    async_engine = create_async_engine(async_database_uri,poolclass=InstrumentedAsyncPool,connect_args=async_connect_args,**pool_options)
+    for name,listener in (("connect",on_connect),("checkout",on_checkout),("checkin",on_checkin),("invalidate",on_invalidate),("soft_invalidate",on_soft_invalidate)):
+        event.listen(async_engine.sync_engine,name,listener)
+
+    sessionlocal.configure(bind=engine)
+    async_sessionlocal.configure(bind=async_engine)
+
+    # les réplicas restent hors service jusqu'à leur première vérification (check_replicas)
+    replicas.extend(Replica(url) for url in DATABASE_REPLICA_URLS)
+
+# ferme toutes les connexions des pools
+async def dispose_engines():
+    global engine,async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+    if engine is not None:
+        engine.dispose()
+    for replica in replicas:
+        await replica.engine.dispose()
+    replicas.clear()
+    engine = None
+    async_engine = None
+
+# vérifie que la base répond
+async def ping_database():
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+# vérifie chaque réplica et met à jour son état (appelé en tâche de fond avec la base principale)
+async def check_replicas(timeout:float):
+    await asyncio.gather(*(replica.check(timeout) for replica in replicas))
+
+# ouvre d'avance jusqu'à `connections` connexions pour que les premières requêtes n'attendent pas
+async def warm_up_pool(connections:int):
+    await asyncio.gather(*(ping_database() for _ in range(min(connections,DB_POOL_SIZE))))
+
+
+# état courant du pool asynchrone et compteurs cumulés de ce worker
+def pool_status():
+    if async_engine is None:
+        return {"pid":os.getpid(),**pool_stats.as_dict()}
+    pool = async_engine.pool
+    return {
+        "pid":os.getpid(),
+        "size":pool.size(),
+        "checked_in":pool.checkedin(),
+        "checked_out":pool.checkedout(),
+        "overflow":pool.overflow(),
+        "max_overflow":DB_MAX_OVERFLOW,
+        "timeout":DB_POOL_TIMEOUT,
+        **pool_stats.as_dict()
+    }
 
 # déclare la classe de base
 Base = declarative_base()
@@ -32,5 +226,13 @@ def get_db():
     finally:
         db.close()
 
+# déclare la fonction get_async_db
+async def get_async_db():
+    async with async_sessionlocal() as db:
+        yield db
+
 # déclare la dépendance db_dependency
-db_dependency = Annotated[Session, Depends(get_db)]
\ No newline at end of file
+db_dependency = Annotated[Session, Depends(get_db)]
+
+# déclare la dépendance async_db_dependency (n'occupe pas la boucle d'événements pendant les requêtes SQL)
+async_db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
@@ -0,0 +1,23 @@
+from sqlalchemy import select
+from models import Users
+import zlib
+
+# version des joueurs du propriétaire, incrémentée par trigger à chaque écriture sur Players
+async def owner_version(db,owner_id:int):
+    result = await db.execute(select(Users.players_version).where(Users.id == owner_id))
+    return result.scalar() or 0
+
+# ETag faible dérivé de la version du propriétaire et des paramètres de la ressource
+def make_etag(owner_id:int,version:int,*parts):
+    digest = zlib.crc32(repr(parts).encode())
+    return f'W/"{owner_id}-{version}-{digest:08x}"'
+
+# compare If-None-Match (liste ou *) à l'ETag, en comparaison faible
+# * ne vaut que pour une ressource existante: wildcard=False tant que son existence n'est pas vérifiée
+def etag_matches(if_none_match:str|None,etag:str,wildcard:bool=True):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return wildcard
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
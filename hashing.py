@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor,ProcessPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from starlette import status
+from metrics import password_hash_duration
+import asyncio
+import time
+import os
+from dotenv import load_dotenv
+
+# charge les variables d'environnement
+load_dotenv()
+
+# config du pool de hachage
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR","thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS","4"))
+PASSWORD_HASH_MAX_INFLIGHT = int(os.getenv("PASSWORD_HASH_MAX_INFLIGHT","16"))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT","2"))
+
+# bcrypt config
+bcrypt_context = CryptContext(schemes=["bcrypt"],deprecated="auto")
+
+# déclare le pool (bcrypt libère le GIL, les threads suffisent en général)
+if PASSWORD_HASH_EXECUTOR == "process":
+    password_executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+else:
+    password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS,thread_name_prefix="bcrypt")
+
+# limite le nombre de hachages en cours ou en attente
+password_slots = asyncio.Semaphore(PASSWORD_HASH_MAX_INFLIGHT)
+
+# fonctions exécutées dans le pool (au niveau du module pour être picklables)
+def _hash(password:str):
+    return bcrypt_context.hash(password)
+
+def _verify(password:str,hashed_password:str):
+    return bcrypt_context.verify(password,hashed_password)
+
+# exécute le travail bcrypt dans le pool, 503 si la file d'attente est pleine trop longtemps
+async def run_password_work(func,*args):
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(password_slots.acquire(),timeout=PASSWORD_HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,detail="serveur surchargé, réessayez plus tard",headers={"Retry-After":"1"})
+    try:
+        return await asyncio.get_running_loop().run_in_executor(password_executor,func,*args)
+    finally:
+        password_slots.release()
+        password_hash_duration.observe(time.perf_counter()-started)
+
+# hache un mot de passe sans bloquer la boucle d'événements
+async def hash_password(password:str):
+    return await run_password_work(_hash,password)
+
+# vérifie un mot de passe sans bloquer la boucle d'événements
+async def verify_password(password:str,hashed_password:str):
+    return await run_password_work(_verify,password,hashed_password)
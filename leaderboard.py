@@ -0,0 +1,73 @@
+from sqlalchemy import select,func
+from models import Players,LevelCounts
+from cache import LRUTTLCache
+import os
+from dotenv import load_dotenv
+
+# charge les variables d'environnement
+load_dotenv()
+
+# durée de vie des classements en cache (secondes) et taille max d'un top
+LEADERBOARD_CACHE_TTL = float(os.getenv("LEADERBOARD_CACHE_TTL","5"))
+DEFAULT_LEADERBOARD_LIMIT = 10
+MAX_LEADERBOARD_LIMIT = 100
+
+# nombre de trophées, même expression que les index ix_players_leaderboard*
+trophy_count = func.cardinality(Players.trophe)
+
+# ordre du classement, identique aux index pour que le top N soit une simple lecture d'index
+LEADERBOARD_ORDER = (Players.niveau.desc().nulls_last(),trophy_count.desc(),Players.id.asc())
+
+LEADERBOARD_COLUMNS = (Players.id,Players.nom,Players.classe,Players.niveau,trophy_count.label("trophees"))
+
+# cache des classements de ce worker, expiré par TTL seulement: le vider à chaque écriture l'empêcherait
+# de servir sous une charge d'écritures continue, et un classement vieux de quelques secondes est acceptable
+leaderboard_cache = LRUTTLCache(maxsize=10000,ttl=LEADERBOARD_CACHE_TTL)
+
+
+# top N global ou d'une classe
+def build_top_query(classe:str|None=None,limit:int=DEFAULT_LEADERBOARD_LIMIT):
+    statement = select(*LEADERBOARD_COLUMNS)
+    if classe is not None:
+        statement = statement.where(Players.classe == classe)
+    return statement.order_by(*LEADERBOARD_ORDER).limit(limit)
+
+# joueurs strictement devant, en une instruction (un seul instantané):
+# niveaux supérieurs lus dans level_counts (NULL compté sous 0, donc derrière tous les niveaux),
+# puis deux comptages sur des plages d'index du niveau du joueur: plus de trophées, ou autant avec un id plus petit
+def build_ahead_query(niveau:int|None,trophees:int,player_id:int,classe:str|None=None):
+    level = Players.niveau.is_(None) if niveau is None else Players.niveau == niveau
+    above = select(func.coalesce(func.sum(LevelCounts.players),0)).where(LevelCounts.niveau > (niveau or 0))
+    more_trophies = select(func.count()).select_from(Players).where(level,trophy_count > trophees)
+    tied_before = select(func.count()).select_from(Players).where(level,trophy_count == trophees,Players.id < player_id)
+    if classe is not None:
+        above = above.where(LevelCounts.classe == classe)
+        more_trophies = more_trophies.where(Players.classe == classe)
+        tied_before = tied_before.where(Players.classe == classe)
+    return select(above.scalar_subquery()+more_trophies.scalar_subquery()+tied_before.scalar_subquery())
+
+async def top_players(db,classe:str|None=None,limit:int=DEFAULT_LEADERBOARD_LIMIT):
+    key = ("top",classe,limit)
+    players = leaderboard_cache.get(key)
+    if players is None:
+        result = await db.execute(build_top_query(classe,limit))
+        keys = tuple(result.keys())
+        players = [{"rang":rank,**dict(zip(keys,row))} for rank,row in enumerate(result.all(),start=1)]
+        leaderboard_cache.set(key,players)
+    return players
+
+# rang d'un joueur (global et dans sa classe), None si le joueur n'existe pas
+async def player_rank(db,player_id:int):
+    key = ("rank",player_id)
+    rank = leaderboard_cache.get(key)
+    if rank is None:
+        result = await db.execute(select(*LEADERBOARD_COLUMNS).where(Players.id == player_id))
+        row = result.first()
+        if row is None:
+            return None
+        trophees = row.trophees or 0
+        ahead_global = (await db.execute(build_ahead_query(row.niveau,trophees,player_id))).scalar()
+        ahead_classe = (await db.execute(build_ahead_query(row.niveau,trophees,player_id,row.classe))).scalar()
+        rank = {**dict(zip(result.keys(),row)),"rang":ahead_global+1,"rang_classe":ahead_classe+1}
+        leaderboard_cache.set(key,rank)
+    return rank
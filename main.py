@@ -1,13 +1,56 @@
 from fastapi import FastAPI 
-import models
-from database import engine
-from router import players_router,uers_router,autho_router,admin_router
+from fastapi.responses import ORJSONResponse
+from contextlib import asynccontextmanager
+from database import init_engines,dispose_engines,warm_up_pool
+from router import players_router,uers_router,autho_router,admin_router,metrics_router,health_router,leaderboard_router
+from metrics import MetricsMiddleware
+from admission import AdmissionMiddleware
+from read_routing import StickyReadsMiddleware
+import asyncio
+import logging
+import time
+import os
+from dotenv import load_dotenv
 
-# crée l'instance de l'application FastAPI
-app = FastAPI()
+# charge les variables d'environnement
+load_dotenv()
 
-# crée toutes les tables dans la base de données
-models.Base.metadata.create_all(bind=engine)
+logger = logging.getLogger("api")
+
+# nombre de connexions ouvertes d'avance au démarrage (0 = aucune)
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP","0"))
+
+# démarrage et arrêt du worker: le schéma est géré par Alembic (alembic upgrade head), rien n'est créé ici
+@asynccontextmanager
+async def lifespan(app:FastAPI):
+    started = time.perf_counter()
+    init_engines()
+    if DB_POOL_WARMUP:
+        try:
+            await asyncio.wait_for(warm_up_pool(DB_POOL_WARMUP),timeout=health_router.DB_HEALTH_TIMEOUT)
+        except Exception as e:
+            # une base lente ne doit pas bloquer le démarrage, /readyz le signalera
+            logger.warning("préchauffage du pool impossible: %s",e)
+    health_task = asyncio.create_task(health_router.watch_database())
+    health_router.startup["seconds"] = time.perf_counter()-started
+    logger.info("worker %s prêt en %.1f ms",os.getpid(),health_router.startup["seconds"]*1000)
+    try:
+        yield
+    finally:
+        health_task.cancel()
+        await dispose_engines()
+
+# crée l'instance de l'application FastAPI (orjson pour sérialiser toutes les réponses)
+app = FastAPI(default_response_class=ORJSONResponse,lifespan=lifespan)
+
+# cookie signé sur les réponses d'écriture: les lectures suivantes du client restent sur la base principale
+app.add_middleware(StickyReadsMiddleware)
+
+# budgets de concurrence par classe de route (auth, bulk, crud), rejet en 503 au-delà
+app.add_middleware(AdmissionMiddleware)
+
+# mesure latence, statuts et requêtes SQL de chaque route (ajouté en dernier: mesure aussi les rejets)
+app.add_middleware(MetricsMiddleware)
 
 # inclut le routeur des joueurs
 app.include_router(players_router.router)
@@ -21,6 +64,11 @@ app.include_router(autho_router.router)
 # inclut le routeur de l admin
 app.include_router(admin_router.router)
 
+# inclut le routeur des classements
+app.include_router(leaderboard_router.router)
 
+# inclut le routeur des métriques
+app.include_router(metrics_router.router)
 
-
+# inclut les sondes liveness/readiness
+app.include_router(health_router.router)
@@ -0,0 +1,184 @@
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import logging
+import time
+import os
+from dotenv import load_dotenv
+
+# charge les variables d'environnement
+load_dotenv()
+
+logger = logging.getLogger("api.metrics")
+
+# budget SQL par requête HTTP: au-delà, un warning liste les requêtes SQL (détecte les N+1)
+METRICS_QUERY_BUDGET = int(os.getenv("METRICS_QUERY_BUDGET","20"))
+METRICS_DB_TIME_BUDGET_MS = float(os.getenv("METRICS_DB_TIME_BUDGET_MS","250"))
+
+# bornes des histogrammes de latence (secondes)
+LATENCY_BUCKETS = (0.005,0.01,0.025,0.05,0.1,0.25,0.5,1.0,2.5,5.0,10.0)
+QUERY_COUNT_BUCKETS = (0,1,2,5,10,20,50,100)
+
+
+# histogramme cumulatif au format Prometheus, une série par combinaison de labels
+class Histogram:
+
+    def __init__(self,name:str,help:str,labels:tuple,buckets:tuple):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self,value:float,*label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = {"buckets":[0]*len(self.buckets),"sum":0.0,"count":0}
+        for index,bound in enumerate(self.buckets):
+            if value <= bound:
+                series["buckets"][index] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}",f"# TYPE {self.name} histogram"]
+        for label_values,series in self.series.items():
+            labels = format_labels(self.labels,label_values)
+            for bound,count in zip(self.buckets,series["buckets"]):
+                lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="+Inf"}} {series["count"]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series['sum']}")
+            lines.append(f"{self.name}_count{{{labels}}} {series['count']}")
+        return lines
+
+
+# compteur au format Prometheus, une série par combinaison de labels
+class Counter:
+
+    def __init__(self,name:str,help:str,labels:tuple):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.series = {}
+
+    def inc(self,*label_values,amount:float=1):
+        self.series[label_values] = self.series.get(label_values,0)+amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}",f"# TYPE {self.name} counter"]
+        for label_values,value in self.series.items():
+            lines.append(f"{self.name}{{{format_labels(self.labels,label_values)}}} {value}")
+        return lines
+
+
+def escape_label(value):
+    return str(value).replace("\\","\\\\").replace('"','\\"').replace("\n","\\n")
+
+def format_labels(names:tuple,values:tuple):
+    return ",".join(f'{name}="{escape_label(value)}"' for name,value in zip(names,values))
+
+# rend une jauge (valeur instantanée) au format Prometheus
+def render_gauge(name:str,help:str,value:float):
+    return [f"# HELP {name} {help}",f"# TYPE {name} gauge",f"{name} {value}"]
+
+# rend un compteur cumulé lu ailleurs (pool, cache...) au format Prometheus
+def render_counter(name:str,help:str,value:float):
+    return [f"# HELP {name} {help}",f"# TYPE {name} counter",f"{name} {value}"]
+
+
+# métriques de ce worker
+http_request_duration = Histogram("http_request_duration_seconds","Latence des requêtes HTTP par route",("method","route"),LATENCY_BUCKETS)
+http_requests_total = Counter("http_requests_total","Requêtes HTTP par route et statut",("method","route","status"))
+db_queries_per_request = Histogram("db_queries_per_request","Nombre de requêtes SQL par requête HTTP",("method","route"),QUERY_COUNT_BUCKETS)
+db_request_duration = Histogram("db_request_duration_seconds","Temps passé en base par requête HTTP",("method","route"),LATENCY_BUCKETS)
+password_hash_duration = Histogram("password_hash_duration_seconds","Durée du travail bcrypt (attente du pool incluse)",(),LATENCY_BUCKETS)
+sql_budget_exceeded_total = Counter("sql_budget_exceeded_total","Requêtes HTTP au-delà du budget SQL",("method","route"))
+
+# sources supplémentaires (pool, cache...) appelées au rendu, chacune renvoie des lignes Prometheus
+collectors = []
+
+
+# compteurs SQL de la requête HTTP en cours
+class RequestStats:
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = []
+
+    def record_query(self,statement:str,seconds:float):
+        self.queries += 1
+        self.db_seconds += seconds
+        self.statements.append((statement,seconds))
+
+current_request = ContextVar("current_request",default=None)
+
+
+# mesure chaque requête SQL de tous les moteurs (sync et async) et l'attribue à la requête HTTP en cours
+@event.listens_for(Engine,"before_cursor_execute")
+def before_cursor_execute(conn,cursor,statement,parameters,context,executemany):
+    conn.info.setdefault("query_started",[]).append(time.perf_counter())
+
+@event.listens_for(Engine,"after_cursor_execute")
+def after_cursor_execute(conn,cursor,statement,parameters,context,executemany):
+    started = conn.info["query_started"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.record_query(statement,time.perf_counter()-started)
+
+# une requête en erreur ne passe pas par after_cursor_execute: retire son horodatage
+@event.listens_for(Engine,"handle_error")
+def handle_error(context):
+    if context.connection is not None and context.connection.info.get("query_started"):
+        context.connection.info["query_started"].pop()
+
+
+# middleware ASGI: latence, statut et coût SQL par route
+class MetricsMiddleware:
+
+    def __init__(self,app):
+        self.app = app
+
+    async def __call__(self,scope,receive,send):
+        if scope["type"] != "http":
+            await self.app(scope,receive,send)
+            return
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code = 500
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        started = time.perf_counter()
+        try:
+            await self.app(scope,receive,send_with_status)
+        finally:
+            elapsed = time.perf_counter()-started
+            current_request.reset(token)
+            # le template de la route (/player/{player_id}) évite une série par id
+            route = scope.get("route")
+            route_path = getattr(route,"path","unmatched")
+            method = scope["method"]
+            http_request_duration.observe(elapsed,method,route_path)
+            http_requests_total.inc(method,route_path,status_code)
+            db_queries_per_request.observe(stats.queries,method,route_path)
+            db_request_duration.observe(stats.db_seconds,method,route_path)
+            if stats.queries > METRICS_QUERY_BUDGET or stats.db_seconds*1000 > METRICS_DB_TIME_BUDGET_MS:
+                sql_budget_exceeded_total.inc(method,route_path)
+                logger.warning(
+                    "budget SQL dépassé pour %s %s: %d requêtes, %.1f ms en base\n%s",
+                    method,route_path,stats.queries,stats.db_seconds*1000,
+                    "\n".join(f"[{seconds*1000:.1f} ms] {statement}" for statement,seconds in stats.statements)
+                )
+
+
+# rend toutes les métriques au format texte Prometheus
+def render_metrics():
+    lines = []
+    for metric in (http_request_duration,http_requests_total,db_queries_per_request,db_request_duration,password_hash_duration,sql_budget_exceeded_total):
+        lines.extend(metric.render())
+    for collector in collectors:
+        lines.extend(collector())
+    return "\n".join(lines)+"\n"
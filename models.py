@@ -1,5 +1,5 @@
 from database import Base
-from sqlalchemy import Column,String,Integer,Boolean,ARRAY,ForeignKey
+from sqlalchemy import Column,String,Integer,BigInteger,Boolean,ARRAY,ForeignKey,Index,DDL,event,func
 
 
 class Players(Base):
@@ -13,6 +13,22 @@ class Players(Base):
     actif = Column(Boolean, default=True) 
     owner_id = Column(Integer, ForeignKey("Users.id"), nullable=False)
 
+    __table_args__ = (
+        # index trigramme pour la recherche par nom (préfixe et similarité)
+        Index("ix_players_nom_trgm", "nom", postgresql_using="gin", postgresql_ops={"nom": "gin_trgm_ops"}),
+        # requêtes filtrées par propriétaire et triées par id
+        Index("ix_players_owner_id_id", "owner_id", "id"),
+        # classements global et par classe (niveau, nombre de trophées, id)
+        Index("ix_players_leaderboard", niveau.desc().nulls_last(), func.cardinality(trophe).desc(), id),
+        Index("ix_players_leaderboard_classe", classe, niveau.desc().nulls_last(), func.cardinality(trophe).desc(), id),
+        # filtres sur les trophées (&& et @>)
+        Index("ix_players_trophe_gin", trophe, postgresql_using="gin"),
+    )
+
+
+# pg_trgm doit exister avant la création de l'index trigramme
+event.listen(Players.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
 
 class Users(Base):
     __tablename__ = "Users"
@@ -23,4 +39,26 @@ class Users(Base):
     username = Column(String, unique=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     role = Column(String, default="user")
+    # incrémenté par trigger à chaque écriture sur ses joueurs (ETags)
+    players_version = Column(BigInteger, nullable=False, server_default="0")
+
+
+class TrophyCounts(Base):
+    __tablename__ = "trophy_counts"
+
+    # tenu à jour par les triggers players_trophy_counts_* (voir migration 6299e9573523)
+    trophe = Column(String, primary_key=True)
+    holders = Column(BigInteger, nullable=False, server_default="0")
+
+    __table_args__ = (
+        Index("ix_trophy_counts_holders", holders.desc()),
+    )
+
+
+class LevelCounts(Base):
+    __tablename__ = "level_counts"
 
+    # tenu à jour par les triggers players_level_counts_* (voir migration 11042a9fd246), niveau NULL compté sous 0
+    classe = Column(String, primary_key=True)
+    niveau = Column(Integer, primary_key=True)
+    players = Column(BigInteger, nullable=False, server_default="0")
@@ -0,0 +1,40 @@
+from fastapi import HTTPException
+from sqlalchemy import select
+from starlette import status
+from models import Players
+
+# colonnes que le client peut demander avec fields=
+PLAYER_FIELDS = {column.name: column for column in Players.__table__.columns}
+
+# taille de page par défaut et maximale
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+
+# transforme "id,nom,niveau" en colonnes (id toujours inclus car il sert de curseur)
+def parse_fields(fields:str|None):
+    if not fields:
+        return list(PLAYER_FIELDS.values())
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PLAYER_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail=f"champs inconnus: {', '.join(unknown)}")
+    return [PLAYER_FIELDS[name] for name in dict.fromkeys(["id",*names])]
+
+# requête d'une page (une ligne de plus pour savoir s'il reste une page)
+def build_page_query(*filters,limit:int=DEFAULT_PAGE_LIMIT,after:int|None=None,fields:str|None=None):
+    statement = select(*parse_fields(fields)).where(*filters)
+    if after is not None:
+        statement = statement.where(Players.id > after)
+    return statement.order_by(Players.id.asc()).limit(limit+1)
+
+# pagination par curseur (keyset sur Players.id): coût constant quelle que soit la page
+async def paginate_players(db,*filters,limit:int=DEFAULT_PAGE_LIMIT,after:int|None=None,fields:str|None=None):
+    result = await db.execute(build_page_query(*filters,limit=limit,after=after,fields=fields))
+    keys = tuple(result.keys())
+    rows = result.all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+    # dictionnaires construits directement depuis les tuples, sans objets ORM
+    return {"items":[dict(zip(keys,row)) for row in rows],"next_cursor":next_cursor}
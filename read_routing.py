@@ -0,0 +1,118 @@
+from contextvars import ContextVar
+from database import async_sessionlocal,replicas
+from cache import player_cache
+from metrics import Counter
+import hashlib
+import hmac
+import itertools
+import time
+import os
+from dotenv import load_dotenv
+
+# charge les variables d'environnement
+load_dotenv()
+
+# durée (s) pendant laquelle un utilisateur qui vient d'écrire lit sur la base principale (lire ses propres écritures)
+DB_REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS","5"))
+
+# clé de signature du cookie (la même que celle des JWT)
+SECRET_KEY = os.getenv("SECRET_KEY")
+
+# cookie signé posé sur les réponses d'écriture: le client le renvoie à n'importe quel worker
+STICKY_COOKIE = "read_primary_until"
+
+# sessions de lecture ouvertes par cible (primary ou réplica) et raison du choix
+db_reads_total = Counter("db_reads_total","Sessions de lecture par cible et raison du routage",("target","reason"))
+
+rotation = itertools.count()
+
+# échéance par utilisateur sur ce worker: table dédiée, jamais évincée par le cache des joueurs
+sticky_until = {}
+
+# écriture faite pendant la requête HTTP en cours (lue par StickyReadsMiddleware)
+class RequestWrites:
+
+    def __init__(self):
+        self.wrote = False
+
+current_writes = ContextVar("current_writes",default=None)
+
+
+def sign(value:str):
+    return hmac.new((SECRET_KEY or "").encode(),f"{STICKY_COOKIE}:{value}".encode(),hashlib.sha256).hexdigest()[:32]
+
+# marqueur "<échéance unix>.<signature>"
+def make_marker(until:int):
+    return f"{until}.{sign(str(until))}"
+
+def marker_valid(marker:str|None):
+    if not marker or "." not in marker:
+        return False
+    until,signature = marker.split(".",1)
+    if not until.isdigit() or not hmac.compare_digest(signature,sign(until)):
+        return False
+    return int(until) > time.time()
+
+# à appeler après une écriture: les utilisateurs donnés (et le client de la requête en cours) lisent sur la base principale
+def stick_to_primary(*user_ids:int):
+    if not replicas:
+        return
+    now = time.monotonic()
+    for user_id in set(user_ids):
+        sticky_until[user_id] = now+DB_REPLICA_STICKY_SECONDS
+    # purge des échéances passées pour que la table reste à la taille des écrivains récents
+    if len(sticky_until) > 1000:
+        for user_id in [user_id for user_id,until in sticky_until.items() if until <= now]:
+            del sticky_until[user_id]
+    writes = current_writes.get()
+    if writes is not None:
+        writes.wrote = True
+
+# chaque écriture de joueurs invalide le cache de leurs propriétaires: ils lisent ensuite sur la base principale
+player_cache.on_invalidate(lambda owner_ids: stick_to_primary(*owner_ids))
+
+
+# middleware ASGI: pose le cookie signé sur la réponse d'une requête qui a écrit
+class StickyReadsMiddleware:
+
+    def __init__(self,app):
+        self.app = app
+
+    async def __call__(self,scope,receive,send):
+        if scope["type"] != "http" or not replicas:
+            await self.app(scope,receive,send)
+            return
+        writes = RequestWrites()
+        token = current_writes.set(writes)
+        async def send_with_marker(message):
+            if message["type"] == "http.response.start" and writes.wrote:
+                seconds = max(1,round(DB_REPLICA_STICKY_SECONDS))
+                cookie = f"{STICKY_COOKIE}={make_marker(int(time.time())+seconds)}; Max-Age={seconds}; Path=/; HttpOnly; SameSite=Lax"
+                message = {**message,"headers":[*message.get("headers",[]),(b"set-cookie",cookie.encode())]}
+            await send(message)
+        try:
+            await self.app(scope,receive,send_with_marker)
+        finally:
+            current_writes.reset(token)
+
+
+# réplica suivant parmi ceux en bonne santé (tourniquet), None si aucun
+def next_replica():
+    healthy = [replica for replica in replicas if replica.healthy]
+    if not healthy:
+        return None
+    return healthy[next(rotation)%len(healthy)]
+
+# choisit où lire: base principale si l'utilisateur ou le client vient d'écrire, ou si aucun réplica ne répond
+def read_sessionmaker(user_id:int|None,marker:str|None=None):
+    if not replicas:
+        return async_sessionlocal
+    if (user_id is not None and sticky_until.get(user_id,0) > time.monotonic()) or marker_valid(marker):
+        db_reads_total.inc("primary","sticky")
+        return async_sessionlocal
+    replica = next_replica()
+    if replica is None:
+        db_reads_total.inc("primary","fallback")
+        return async_sessionlocal
+    db_reads_total.inc(replica.name,"round_robin")
+    return replica.sessionlocal
@@ -1,8 +1,29 @@
-from fastapi import APIRouter,Path,HTTPException
-from database import db_dependency
+from fastapi import APIRouter,Path,HTTPException,Query,Cookie
+from fastapi.responses import StreamingResponse,ORJSONResponse
+from database import async_db_dependency,pool_status
+from sqlalchemy import select,delete
 from starlette import status 
 from models import Players
-from router.autho_router import user_dependency
+from classes import PlayerPage,PlayerSearchResult
+from router.autho_router import user_dependency,read_db_dependency
+from read_routing import read_sessionmaker,stick_to_primary
+from pagination import paginate_players,DEFAULT_PAGE_LIMIT,MAX_PAGE_LIMIT,PLAYER_FIELDS
+from search import search_players,DEFAULT_SEARCH_LIMIT,MAX_SEARCH_LIMIT
+from trophies import trophy_filter,trophy_counts,MAX_TROPHY_FILTER,DEFAULT_TROPHY_COUNTS_LIMIT,MAX_TROPHY_COUNTS_LIMIT
+from cache import player_cache
+from stats import player_stats
+from typing import Literal,List
+import csv
+import io
+import os
+import orjson
+from dotenv import load_dotenv
+
+# charge les variables d'environnement
+load_dotenv()
+
+# nombre de lignes lues par lot depuis le curseur serveur pendant un export
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE","1000"))
 
 #  le routeur pour les actions administrateur
 router = APIRouter(
@@ -10,21 +31,103 @@ router = APIRouter(
     prefix="/admin"
 )
 
-# récupère tous les joueurs de tous les utilisateurs (réservé admin)
-@router.get("/Players",status_code=status.HTTP_200_OK)
-async def get_all_payers(user:user_dependency,db:db_dependency):
+# récupère les joueurs de tous les utilisateurs, page par page (réservé admin)
+@router.get("/Players",status_code=status.HTTP_200_OK,response_model=PlayerPage)
+async def get_all_payers(user:user_dependency,db:read_db_dependency,limit:int=Query(default=DEFAULT_PAGE_LIMIT,ge=1,le=MAX_PAGE_LIMIT),after:int|None=Query(default=None,ge=0),fields:str|None=Query(default=None,examples=["id,nom,niveau"])):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
+    return ORJSONResponse(await paginate_players(db,limit=limit,after=after,fields=fields))
+
+# recherche des joueurs par nom sur tous les utilisateurs ou un seul propriétaire (réservé admin)
+@router.get("/search",status_code=status.HTTP_200_OK,response_model=List[PlayerSearchResult])
+async def search_player_by_nom(user:user_dependency,db:read_db_dependency,q:str=Query(min_length=3,max_length=30),mode:Literal["prefix","similarity"]=Query(default="prefix"),limit:int=Query(default=DEFAULT_SEARCH_LIMIT,ge=1,le=MAX_SEARCH_LIMIT),owner_id:int|None=Query(default=None,ge=1)):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
+    filters = [Players.owner_id == owner_id] if owner_id is not None else []
+    return ORJSONResponse(await search_players(db,q,*filters,mode=mode,limit=limit))
+
+# joueurs ayant un des trophées (any) ou tous (all), sur tous les utilisateurs ou un seul propriétaire (réservé admin)
+@router.get("/trophe",status_code=status.HTTP_200_OK,response_model=PlayerPage)
+async def get_players_by_trophe(user:user_dependency,db:read_db_dependency,trophe:List[str]=Query(min_length=1,max_length=MAX_TROPHY_FILTER),mode:Literal["any","all"]=Query(default="any"),limit:int=Query(default=DEFAULT_PAGE_LIMIT,ge=1,le=MAX_PAGE_LIMIT),after:int|None=Query(default=None,ge=0),fields:str|None=Query(default=None,examples=["id,nom,trophe"]),owner_id:int|None=Query(default=None,ge=1)):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
+    filters = [Players.owner_id == owner_id] if owner_id is not None else []
+    return ORJSONResponse(await paginate_players(db,*filters,trophy_filter(trophe,mode),limit=limit,after=after,fields=fields))
+
+# nombre de détenteurs par trophée sur toute la base, lu dans trophy_counts (réservé admin)
+@router.get("/trophe/counts",status_code=status.HTTP_200_OK)
+async def get_trophe_counts(user:user_dependency,db:read_db_dependency,trophe:List[str]|None=Query(default=None,max_length=MAX_TROPHY_COUNTS_LIMIT),limit:int=Query(default=DEFAULT_TROPHY_COUNTS_LIMIT,ge=1,le=MAX_TROPHY_COUNTS_LIMIT)):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
+    return ORJSONResponse(await trophy_counts(db,trophe,limit))
+
+# génère l'export lot par lot depuis un curseur serveur (sa propre session, ouverte le temps du flux)
+async def stream_players(sessionmaker,filters:list,format:str):
+    columns = list(PLAYER_FIELDS.values())
+    statement = select(*columns).where(*filters).order_by(Players.id.asc()).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    async with sessionmaker() as db:
+        result = await db.stream(statement)
+        if format == "csv":
+            yield ",".join(column.name for column in columns)+"\r\n"
+        keys = tuple(result.keys())
+        async for rows in result.partitions():
+            if format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows([["|".join(value) if isinstance(value,list) else value for value in row] for row in rows])
+                yield buffer.getvalue()
+            else:
+                yield b"".join(orjson.dumps(dict(zip(keys,row)))+b"\n" for row in rows)
+
+# exporte les joueurs en NDJSON ou CSV sans tout charger en mémoire (réservé admin)
+@router.get("/export",status_code=status.HTTP_200_OK)
+async def export_players(user:user_dependency,format:Literal["ndjson","csv"]=Query(default="ndjson"),owner_id:int|None=Query(default=None,ge=1),classe:str|None=Query(default=None),actif:bool|None=Query(default=None),read_primary_until:str|None=Cookie(default=None)):
     if user is None or user.get("user_role") != "admin":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
-    return db.query(Players).order_by(Players.id.asc()).all()
+    filters = []
+    if owner_id is not None:
+        filters.append(Players.owner_id == owner_id)
+    if classe is not None:
+        filters.append(Players.classe == classe.lower())
+    if actif is not None:
+        filters.append(Players.actif == actif)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    # l'export, la plus grosse lecture, part sur un réplica quand il y en a un
+    sessionmaker = read_sessionmaker(user.get("id"),read_primary_until)
+    return StreamingResponse(stream_players(sessionmaker,filters,format),media_type=media_type,headers={"Content-Disposition":f"attachment; filename=players.{format}"})
 
 
 # supprime n'importe quel joueur sans vérifier le propriétaire (réservé admin)
 @router.delete("/delete/{player_id}",status_code=status.HTTP_204_NO_CONTENT)
-async def delete_payer(user:user_dependency,db:db_dependency,player_id:int=Path(ge=1)):
+async def delete_payer(user:user_dependency,db:async_db_dependency,player_id:int=Path(ge=1)):
     if user is None or user.get("user_role") != "admin":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
-    player_found = db.query(Players).filter(Players.id == player_id).first()
-    if not player_found:
+    # un seul DELETE ... RETURNING: le propriétaire renvoyé sert à invalider son cache
+    result = await db.execute(delete(Players).where(Players.id == player_id).returning(Players.owner_id))
+    owner_id = result.scalar()
+    if owner_id is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="player n'existe pas")
-    db.delete(player_found)
-    db.commit()
\ No newline at end of file
+    await db.commit()
+    await player_cache.invalidate(owner_id)
+    stick_to_primary(user.get("id"))
+
+# statistiques de population des joueurs, calculées en SQL et gardées quelques secondes (réservé admin)
+@router.get("/stats",status_code=status.HTTP_200_OK)
+async def get_player_stats(user:user_dependency,db:read_db_dependency):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
+    return await player_stats(db)
+
+# compteurs du cache des joueurs de ce worker (réservé admin)
+@router.get("/cache",status_code=status.HTTP_200_OK)
+async def get_cache_stats(user:user_dependency):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
+    return player_cache.stats()
+
+# état du pool de connexions du worker qui répond (réservé admin)
+@router.get("/pool",status_code=status.HTTP_200_OK)
+async def get_pool_status(user:user_dependency):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
+    return pool_status()
\ No newline at end of file
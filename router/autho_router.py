@@ -1,13 +1,20 @@
-from fastapi import APIRouter,Body,Depends,HTTPException
-from passlib.context import CryptContext
+from fastapi import APIRouter,Body,Depends,HTTPException,Request,Cookie
 from fastapi.security import OAuth2PasswordRequestForm,OAuth2PasswordBearer
-from database import db_dependency
+from database import async_db_dependency
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 from classes import UserValidation,Token
 from models import Users
+from hashing import hash_password,verify_password
+from cache import LRUTTLCache,player_cache
+from admission import login_limiter
+from read_routing import read_sessionmaker,stick_to_primary
 from starlette import status
 from datetime import timedelta,datetime,timezone
 from jose import jwt,JWTError
+import hashlib
+import time
 import os
 from dotenv import load_dotenv
 
@@ -23,63 +30,119 @@ router = APIRouter(
 SECRET_KEY = os.getenv("SECRET_KEY")
 JWT_ALGO = "HS256"
 
-# bcrypt config
-bcrypt_context = CryptContext(schemes=["bcrypt"],deprecated="auto")
+# cache des tokens déjà vérifiés: évite un jwt.decode complet à chaque requête
+TOKEN_CACHE_MAXSIZE = int(os.getenv("TOKEN_CACHE_MAXSIZE","10000"))
+token_cache = LRUTTLCache(TOKEN_CACHE_MAXSIZE,ttl=0)
+
+# durée de vie des tokens (minutes), c'est aussi la durée de conservation d'une révocation
+ACCESS_TOKEN_MINUTES = 30
+
+# date de révocation par utilisateur: les tokens émis avant sont refusés
+# copie locale (jamais évincée) + backend du cache, partagé entre workers quand il est externe
+revoked_before = {}
+
+def revoked_key(user_id:int):
+    return f"tokens:revoked:{user_id}"
+
+# copie locale de la révocation partagée: au plus une lecture du backend par utilisateur et par REVOCATION_CHECK_TTL
+# (délai max avant qu'une révocation faite par un autre worker s'applique ici)
+REVOCATION_CHECK_TTL = float(os.getenv("REVOCATION_CHECK_TTL","5"))
+shared_revocations = LRUTTLCache(TOKEN_CACHE_MAXSIZE,ttl=REVOCATION_CHECK_TTL)
 
 # declare oath2bearer
 oauth2bearer = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 # function authenticate
-def user_authenticate(username:str,password:str,db):
-    autho_found = db.query(Users).filter(Users.username == username).first()
+async def user_authenticate(username:str,password:str,db):
+    result = await db.execute(select(Users).where(Users.username == username))
+    autho_found = result.scalars().first()
     if  not autho_found:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="no authenticad")
-    if not bcrypt_context.verify(password,autho_found.hashed_password):
+    if not await verify_password(password,autho_found.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="no authenticad")
     return autho_found
 
 # function create token
 def create_token(username:str,user_id:int,role:str,expires_delta:timedelta):
     token_db =  {"sub":username,"id":user_id,"user_role":role}
-    expiration = datetime.now(timezone.utc)+expires_delta
-    token_db.update({"exp":expiration.timestamp()}) 
+    issued_at = datetime.now(timezone.utc)
+    expiration = issued_at+expires_delta
+    token_db.update({"iat":issued_at.timestamp(),"exp":expiration.timestamp()}) 
     return jwt.encode(token_db,SECRET_KEY,algorithm=JWT_ALGO)
 
+# révoque tous les tokens déjà émis pour cet utilisateur (changement de mot de passe...)
+async def revoke_user_tokens(user_id:int):
+    now = time.time()
+    revoked_before[user_id] = now
+    await player_cache.backend.set(revoked_key(user_id),now,ACCESS_TOKEN_MINUTES*60)
+
+# date de révocation la plus récente connue de ce worker ou des autres (0 si aucune)
+async def revoked_at(user_id:int):
+    shared = shared_revocations.get(user_id)
+    if shared is None:
+        shared = await player_cache.backend.get(revoked_key(user_id)) or 0
+        shared_revocations.set(user_id,shared)
+    return max(revoked_before.get(user_id,0),shared)
+
 # mildoware function 
-async def current_user(db:db_dependency,token:Annotated[str,Depends(oauth2bearer)]):
-    try:
-        user_load = jwt.decode(token,SECRET_KEY,algorithms=[JWT_ALGO])
+async def current_user(token:Annotated[str,Depends(oauth2bearer)]):
+    digest = hashlib.sha256(token.encode()).digest()
+    cached = token_cache.get(digest)
+    if cached is None:
+        try:
+            user_load = jwt.decode(token,SECRET_KEY,algorithms=[JWT_ALGO])
+        except JWTError:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="non autoriser")
         username = user_load.get("sub")
         user_id = user_load.get("id")
         user_role = user_load.get("user_role")
         if username is None or user_id is None or user_role is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="non autoriser")
-        return {"username":username,"id":user_id,"user_role":user_role}
-    except JWTError:
+        cached = ({"username":username,"id":user_id,"user_role":user_role},user_load.get("iat",0))
+        # garde les claims jusqu'à l'expiration du token
+        token_cache.set(digest,cached,ttl=user_load.get("exp",0)-time.time())
+    user,issued_at = cached
+    if issued_at <= await revoked_at(user["id"]):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="non autoriser")
+    return dict(user)
     
 # declaration de l utilisateur
 user_dependency = Annotated[dict,Depends(current_user)]
 
+# session des routes en lecture seule, sur un réplica sauf juste après une écriture (une écriture échouerait sur un réplica)
+async def get_read_db(user:user_dependency,read_primary_until:str|None=Cookie(default=None)):
+    sessionmaker = read_sessionmaker(user.get("id") if user else None,read_primary_until)
+    async with sessionmaker() as db:
+        yield db
+
+read_db_dependency = Annotated[AsyncSession,Depends(get_read_db)]
+
 # endpoint pour créer un nouveau compte utilisateur
 @router.post("/register",status_code=status.HTTP_201_CREATED)
-async def register_user(db:db_dependency,format_user:UserValidation=Body()):
+async def register_user(db:async_db_dependency,format_user:UserValidation=Body()):
+    hashed_password = await hash_password(format_user.password)
     register_found = Users(
     nom = format_user.nom,
     email = format_user.email,
     username = format_user.username,
-    hashed_password = bcrypt_context.hash(format_user.password),
+    hashed_password = hashed_password,
     role = "user"
     )
     db.add(register_found)
-    db.commit()
+    await db.commit()
+    # /user/me juste après l'inscription ne doit pas partir sur un réplica en retard
+    stick_to_primary(register_found.id)
 
 
 # endpoint pour se connecter et obtenir un token
 @router.post("/login",response_model=Token,status_code=status.HTTP_200_OK)
-async def login_user(db:db_dependency,format:Annotated[OAuth2PasswordRequestForm,Depends()]):
-    user_authenticated = user_authenticate(format.username,format.password,db)
+async def login_user(db:async_db_dependency,request:Request,format:Annotated[OAuth2PasswordRequestForm,Depends()]):
+    # les tentatives échouées consomment un jeton par IP et par username avant le travail bcrypt
+    ip = request.client.host if request.client else "inconnu"
+    login_limiter.check(ip,format.username)
+    user_authenticated = await user_authenticate(format.username,format.password,db)
+    login_limiter.succeeded(ip,format.username)
     if not user_authenticated:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="authentication non autoriser")
-    token = create_token(user_authenticated.username,user_authenticated.id,user_authenticated.role,timedelta(minutes=30))
+    token = create_token(user_authenticated.username,user_authenticated.id,user_authenticated.role,timedelta(minutes=ACCESS_TOKEN_MINUTES))
     return {"access_token":token,"token_type":"Bearer"}
\ No newline at end of file
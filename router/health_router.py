@@ -0,0 +1,61 @@
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+from starlette import status
+from database import ping_database,check_replicas,replicas
+import asyncio
+import logging
+import time
+import os
+from dotenv import load_dotenv
+
+# charge les variables d'environnement
+load_dotenv()
+
+# fréquence et délai max de la vérification de la base en tâche de fond (secondes)
+DB_HEALTH_INTERVAL = float(os.getenv("DB_HEALTH_INTERVAL","5"))
+DB_HEALTH_TIMEOUT = float(os.getenv("DB_HEALTH_TIMEOUT","2"))
+
+logger = logging.getLogger("api.health")
+
+# le routeur des sondes liveness/readiness (sans authentification pour l'orchestrateur)
+router = APIRouter(
+    tags=["HEALTH"]
+)
+
+# dernier état connu de la base: les sondes le lisent sans requête SQL
+db_health = {"ok":False,"checked_at":None,"error":"pas encore vérifiée"}
+
+# durée du démarrage du worker, renseignée par le lifespan
+startup = {"seconds":None}
+
+# vérifie la base une fois et met à jour db_health
+async def check_database():
+    try:
+        await asyncio.wait_for(ping_database(),timeout=DB_HEALTH_TIMEOUT)
+        db_health.update(ok=True,checked_at=time.time(),error=None)
+    except Exception as e:
+        # les sondes ne sont pas authentifiées: seule la classe de l'erreur est exposée, le détail va dans les logs
+        if db_health["ok"] or db_health["error"] != type(e).__name__:
+            logger.warning("base principale indisponible: %r",e)
+        db_health.update(ok=False,checked_at=time.time(),error=type(e).__name__)
+
+# tâche de fond lancée par le lifespan
+async def watch_database():
+    while True:
+        await check_database()
+        # un réplica en panne sort du tourniquet, ses lectures repassent sur la base principale
+        await check_replicas(DB_HEALTH_TIMEOUT)
+        await asyncio.sleep(DB_HEALTH_INTERVAL)
+
+# liveness: le process répond
+@router.get("/healthz",status_code=status.HTTP_200_OK)
+async def liveness():
+    return {"status":"ok","startup_seconds":startup["seconds"]}
+
+# readiness: la base principale répondait à la dernière vérification (les réplicas sont indicatifs)
+@router.get("/readyz",status_code=status.HTTP_200_OK)
+async def readiness():
+    replica_health = [{"replica":index,"ok":replica.healthy,"error":replica.error} for index,replica in enumerate(replicas)]
+    if not db_health["ok"]:
+        return ORJSONResponse({"status":"unavailable","database":db_health,"replicas":replica_health},status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return {"status":"ready","database":db_health,"replicas":replica_health}
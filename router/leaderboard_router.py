@@ -0,0 +1,32 @@
+from fastapi import APIRouter,Path,HTTPException,Query
+from starlette import status 
+from router.autho_router import user_dependency,read_db_dependency
+from classes import CLASSES_AUTORISEES
+from leaderboard import top_players,player_rank,DEFAULT_LEADERBOARD_LIMIT,MAX_LEADERBOARD_LIMIT
+
+# le routeur des classements (tous les joueurs, lecture pour tout utilisateur connecté)
+router = APIRouter(
+    tags=["LEADERBOARD"],
+    prefix="/leaderboard"
+)
+
+# top N global, ou d'une classe (guerrier, mage, archer, voleur)
+@router.get("/",status_code=status.HTTP_200_OK)
+async def get_leaderboard(user:user_dependency,db:read_db_dependency,classe:str|None=Query(default=None),limit:int=Query(default=DEFAULT_LEADERBOARD_LIMIT,ge=1,le=MAX_LEADERBOARD_LIMIT)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
+    if classe is not None:
+        classe = classe.lower()
+        if classe not in CLASSES_AUTORISEES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail=f'La classe doit être parmi: {", ".join(CLASSES_AUTORISEES)}')
+    return await top_players(db,classe,limit)
+
+# rang d'un joueur, global et dans sa classe
+@router.get("/rank/{player_id}",status_code=status.HTTP_200_OK)
+async def get_player_rank(user:user_dependency,db:read_db_dependency,player_id:int=Path(ge=1)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
+    rank = await player_rank(db,player_id)
+    if rank is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="player n'existe pas")
+    return rank
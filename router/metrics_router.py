@@ -0,0 +1,57 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette import status
+from metrics import render_metrics,render_gauge,render_counter,collectors,format_labels
+from database import pool_status,replicas
+from cache import player_cache
+from admission import budgets,login_limiter
+from read_routing import db_reads_total
+
+# le routeur des métriques (format texte Prometheus, sans authentification pour le scraper)
+router = APIRouter(
+    tags=["METRICS"]
+)
+
+# état du pool de connexions de ce worker (taille et emprunts absents tant que les moteurs ne sont pas créés)
+def collect_pool():
+    pool = pool_status()
+    lines = []
+    lines += render_gauge("db_pool_size","Taille du pool de connexions",pool.get("size",0))
+    lines += render_gauge("db_pool_checked_out","Connexions empruntées",pool.get("checked_out",0))
+    lines += render_gauge("db_pool_overflow","Connexions en overflow",pool.get("overflow",0))
+    lines += render_counter("db_pool_checkouts_total","Emprunts de connexion cumulés",pool["checkouts"])
+    lines += render_counter("db_pool_invalidations_total","Connexions invalidées cumulées",pool["invalidations"])
+    lines += render_counter("db_pool_timeouts_total","Attentes de connexion expirées",pool["timeouts"])
+    lines += render_counter("db_pool_wait_seconds_total","Temps cumulé d'attente d'une connexion",pool["wait_seconds_total"])
+    return lines
+
+# compteurs du cache des joueurs de ce worker
+def collect_cache():
+    stats = player_cache.stats()
+    return render_counter("player_cache_hits_total","Lectures servies par le cache",stats["hits"])+render_counter("player_cache_misses_total","Lectures envoyées en base",stats["misses"])
+
+# files d'admission de ce worker: requêtes en cours, en attente et rejetées par classe de route
+def collect_admission():
+    lines = ["# HELP admission_active Requêtes admises en cours par classe","# TYPE admission_active gauge"]
+    lines += [f"admission_active{{{format_labels(('class',),(name,))}}} {budget.active}" for name,budget in budgets.items()]
+    lines += ["# HELP admission_queue_depth Requêtes en attente d'admission par classe","# TYPE admission_queue_depth gauge"]
+    lines += [f"admission_queue_depth{{{format_labels(('class',),(name,))}}} {budget.waiting}" for name,budget in budgets.items()]
+    lines += ["# HELP admission_shed_total Requêtes rejetées en 503 par classe et raison","# TYPE admission_shed_total counter"]
+    lines += [f"admission_shed_total{{{format_labels(('class','reason'),(name,reason))}}} {count}" for name,budget in budgets.items() for reason,count in budget.shed.items()]
+    stats = login_limiter.stats()
+    lines += ["# HELP login_rate_limited_total Tentatives de login rejetées en 429 par seau","# TYPE login_rate_limited_total counter"]
+    lines += [f'login_rate_limited_total{{bucket="ip"}} {stats["rejected_ip"]}',f'login_rate_limited_total{{bucket="username"}} {stats["rejected_username"]}']
+    return lines
+
+# état des réplicas en lecture et routage des sessions de lecture
+def collect_replicas():
+    lines = ["# HELP db_replica_healthy Réplica en service (1) ou écarté (0)","# TYPE db_replica_healthy gauge"]
+    lines += [f"db_replica_healthy{{{format_labels(('replica',),(replica.name,))}}} {int(replica.healthy)}" for replica in replicas]
+    return lines+db_reads_total.render()
+
+collectors.extend([collect_pool,collect_cache,collect_admission,collect_replicas])
+
+# expose les métriques de ce worker
+@router.get("/metrics",status_code=status.HTTP_200_OK,response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(render_metrics(),media_type="text/plain; version=0.0.4")
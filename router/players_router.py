@@ -1,10 +1,20 @@
-from fastapi import APIRouter,Path,HTTPException,Query,Body
-from database import db_dependency
-from sqlalchemy import text
+from fastapi import APIRouter,Path,HTTPException,Query,Body,Header,Response
+from fastapi.responses import ORJSONResponse
+from database import async_db_dependency
+from sqlalchemy import select,insert,update,delete,values,column,Integer,String,Boolean,ARRAY
 from starlette import status 
 from models import Players
-from classes import PlayerValidation
-from router.autho_router import user_dependency
+from classes import PlayerValidation,PlayerBatchUpdate,PlayerPatch,PlayerResponse,PlayerPage,PlayerSearchResult
+from router.autho_router import user_dependency,read_db_dependency
+from pagination import paginate_players,DEFAULT_PAGE_LIMIT,MAX_PAGE_LIMIT,PLAYER_FIELDS
+from cache import player_cache
+from etags import owner_version,make_etag,etag_matches
+from search import search_players,DEFAULT_SEARCH_LIMIT,MAX_SEARCH_LIMIT
+from trophies import trophy_filter,owner_trophy_counts,MAX_TROPHY_FILTER,DEFAULT_TROPHY_COUNTS_LIMIT,MAX_TROPHY_COUNTS_LIMIT
+from typing import Literal,List
+
+# nombre maximal de joueurs par requête batch
+MAX_BATCH_SIZE = 500
 
 # crée le routeur pour les joueurs
 router = APIRouter(
@@ -12,76 +22,174 @@ router = APIRouter(
     prefix="/player"
 )
 
-# endpoint de bienvenue avec test de connexion à la base de données
+# endpoint de bienvenue (l'état de la base est donné par /readyz)
 @router.get("/",status_code=status.HTTP_200_OK)
-async def bienvenue_message(user:user_dependency,db:db_dependency):
+async def bienvenue_message(user:user_dependency):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
-    try:
-        db.execute(text("SELECT 1"))
-        return {"Message":"Bienvenue Sur Notre Api"}
-    except Exception as e:
-        return {"Error":str(e)}
+    return {"Message":"Bienvenue Sur Notre Api"}
 
-# récupère tous les joueurs appartenant à l'utilisateur connecté
-@router.get("/Players",status_code=status.HTTP_200_OK)
-async def get_all_payers(user:user_dependency,db:db_dependency):
+# récupère les joueurs de l'utilisateur connecté, page par page (after = next_cursor de la page précédente)
+@router.get("/Players",status_code=status.HTTP_200_OK,response_model=PlayerPage)
+async def get_all_payers(user:user_dependency,db:read_db_dependency,limit:int=Query(default=DEFAULT_PAGE_LIMIT,ge=1,le=MAX_PAGE_LIMIT),after:int|None=Query(default=None,ge=0),fields:str|None=Query(default=None,examples=["id,nom,niveau"]),if_none_match:str|None=Header(default=None)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
-    return db.query(Players).filter(user.get("id")==Players.owner_id).order_by(Players.id.asc()).all()
+    # 304 avant toute requête sur Players si le client a déjà cette version
+    version = await owner_version(db,user.get("id"))
+    etag = make_etag(user.get("id"),version,"list",limit,after,fields)
+    if etag_matches(if_none_match,etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED,headers={"ETag":etag})
+    # la version dans la clé: une écriture faite par un autre worker invalide aussi ce cache
+    page = await player_cache.get_or_load(
+        user.get("id"),("list",version,limit,after,fields),
+        lambda: paginate_players(db,user.get("id")==Players.owner_id,limit=limit,after=after,fields=fields)
+    )
+    # réponse directe: la page est déjà faite de dictionnaires, pas de revalidation par response_model
+    return ORJSONResponse(page,headers={"ETag":etag})
 
-# récupère un joueur par son id (seulement si il appartient à l'utilisateur)
-@router.get("/{player_id}",status_code=status.HTTP_200_OK)
-async def get_player_by_id(user:user_dependency,db:db_dependency,player_id:int=Path(ge=1)):
+# recherche les joueurs de l'utilisateur par nom (déclarée avant /{player_id} pour ne pas être masquée)
+@router.get("/search",status_code=status.HTTP_200_OK,response_model=List[PlayerSearchResult])
+async def search_player_by_nom(user:user_dependency,db:read_db_dependency,q:str=Query(min_length=3,max_length=30),mode:Literal["prefix","similarity"]=Query(default="prefix"),limit:int=Query(default=DEFAULT_SEARCH_LIMIT,ge=1,le=MAX_SEARCH_LIMIT)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
-    player_found = db.query(Players).filter(player_id == Players.id).filter(user.get("id")==Players.owner_id).first()
-    if not player_found:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="l'id que vous avez saisi n'existe pas")
-    return player_found
+    return ORJSONResponse(await search_players(db,q,user.get("id")==Players.owner_id,mode=mode,limit=limit))
+
+# joueurs de l'utilisateur ayant un des trophées (any) ou tous (all), page par page
+@router.get("/trophe",status_code=status.HTTP_200_OK,response_model=PlayerPage)
+async def get_players_by_trophe(user:user_dependency,db:read_db_dependency,trophe:List[str]=Query(min_length=1,max_length=MAX_TROPHY_FILTER),mode:Literal["any","all"]=Query(default="any"),limit:int=Query(default=DEFAULT_PAGE_LIMIT,ge=1,le=MAX_PAGE_LIMIT),after:int|None=Query(default=None,ge=0),fields:str|None=Query(default=None,examples=["id,nom,trophe"])):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
+    return ORJSONResponse(await paginate_players(db,user.get("id")==Players.owner_id,trophy_filter(trophe,mode),limit=limit,after=after,fields=fields))
 
-# récupère un joueur par son nom (seulement parmi les joueurs de l'utilisateur)
-@router.get("/nom",status_code=status.HTTP_200_OK)
-async def get_player_by_nom(user:user_dependency,db:db_dependency,nom:str=Query(min_length=3)):
+# nombre de joueurs de l'utilisateur par trophée
+@router.get("/trophe/counts",status_code=status.HTTP_200_OK)
+async def get_trophe_counts(user:user_dependency,db:read_db_dependency,limit:int=Query(default=DEFAULT_TROPHY_COUNTS_LIMIT,ge=1,le=MAX_TROPHY_COUNTS_LIMIT)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
-    player_found = db.query(Players).filter(Players.nom.ilike(f"%{nom}%")).filter(user.get("id")==Players.owner_id).all()
+    return ORJSONResponse(await owner_trophy_counts(db,user.get("id"),limit))
+
+# récupère un joueur par son id (seulement si il appartient à l'utilisateur)
+@router.get("/{player_id}",status_code=status.HTTP_200_OK,response_model=PlayerResponse)
+async def get_player_by_id(user:user_dependency,db:read_db_dependency,response:Response,player_id:int=Path(ge=1),if_none_match:str|None=Header(default=None)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
+    version = await owner_version(db,user.get("id"))
+    etag = make_etag(user.get("id"),version,"player",player_id)
+    # 304 sans lire le joueur si l'ETag correspond; If-None-Match: * attend de savoir que le joueur existe
+    if etag_matches(if_none_match,etag,wildcard=False):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED,headers={"ETag":etag})
+    async def load_player():
+        result = await db.execute(select(*PLAYER_FIELDS.values()).where(player_id == Players.id).where(user.get("id")==Players.owner_id))
+        row = result.first()
+        return dict(zip(result.keys(),row)) if row else None
+    player_found = await player_cache.get_or_load(user.get("id"),("player",version,player_id),load_player)
     if not player_found:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="le nom n'a pas été trouvé")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="l'id que vous avez saisi n'existe pas")
+    if etag_matches(if_none_match,etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED,headers={"ETag":etag})
+    response.headers["ETag"] = etag
     return player_found
 
 # crée un nouveau joueur lié à l'utilisateur connecté
 @router.post("/create",status_code=status.HTTP_201_CREATED)
-async def create_player(user:user_dependency,db:db_dependency, format_player:PlayerValidation = Body()):
+async def create_player(user:user_dependency,db:async_db_dependency, format_player:PlayerValidation = Body()):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
     player_found = Players(**format_player.model_dump(exclude="id"),owner_id = user.get("id"))
     db.add(player_found)
-    db.commit()
+    await db.commit()
+    await player_cache.invalidate(user.get("id"))
 
 # met à jour un joueur existant (seulement si il appartient à l'utilisateur)
+# un seul UPDATE ... RETURNING: le 404 vient du nombre de lignes touchées, sans SELECT préalable
 @router.put("/update/{player_id}",status_code=status.HTTP_204_NO_CONTENT)
-async def update_payer(user:user_dependency,db:db_dependency,player_id:int=Path(ge=1),format_player:PlayerValidation=Body()):
+async def update_payer(user:user_dependency,db:async_db_dependency,player_id:int=Path(ge=1),format_player:PlayerValidation=Body()):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
-    player_found = db.query(Players).filter(Players.id == player_id).filter(user.get("id")== Players.owner_id).first()
-    if not player_found:
+    result = await db.execute(
+        update(Players).where(Players.id == player_id).where(user.get("id")== Players.owner_id)
+        .values(**format_player.model_dump()).returning(Players.id)
+    )
+    if result.first() is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="ce player n'existe pas")
-    player_found.nom = format_player.nom
-    player_found.actif = format_player.actif
-    player_found.niveau = format_player.niveau
-    player_found.classe = format_player.classe
-    player_found.trophe = format_player.trophe
-    db.add(player_found)
-    db.commit()
+    await db.commit()
+    await player_cache.invalidate(user.get("id"))
 
-# supprime un joueur (seulement si il appartient à l'utilisateur)
+# met à jour seulement les champs envoyés et renvoie le joueur modifié, en un seul UPDATE ... RETURNING
+@router.patch("/update/{player_id}",status_code=status.HTTP_200_OK,response_model=PlayerResponse)
+async def patch_payer(user:user_dependency,db:async_db_dependency,player_id:int=Path(ge=1),format_player:PlayerPatch=Body()):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
+    changes = format_player.model_dump(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail="aucun champ à mettre à jour")
+    result = await db.execute(
+        update(Players).where(Players.id == player_id).where(user.get("id")== Players.owner_id)
+        .values(**changes).returning(*PLAYER_FIELDS.values())
+    )
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="ce player n'existe pas")
+    player_found = dict(zip(result.keys(),row))
+    await db.commit()
+    await player_cache.invalidate(user.get("id"))
+    return ORJSONResponse(player_found)
+
+# supprime un joueur (seulement si il appartient à l'utilisateur), un seul DELETE ... RETURNING
 @router.delete("/delete/{player_id}",status_code=status.HTTP_204_NO_CONTENT)
-async def delete_payer(user:user_dependency,db:db_dependency,player_id:int=Path(ge=1)):
+async def delete_payer(user:user_dependency,db:async_db_dependency,player_id:int=Path(ge=1)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
-    player_found = db.query(Players).filter(Players.id == player_id).filter(user.get("id")== Players.owner_id).first()
-    if not player_found:
+    result = await db.execute(delete(Players).where(Players.id == player_id).where(user.get("id")== Players.owner_id).returning(Players.id))
+    if result.first() is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="player n'existe pas")
-    db.delete(player_found)
-    db.commit()
\ No newline at end of file
+    await db.commit()
+    await player_cache.invalidate(user.get("id"))
+
+# crée plusieurs joueurs en un seul INSERT ... RETURNING et un seul commit
+@router.post("/batch/create",status_code=status.HTTP_201_CREATED)
+async def create_players_batch(user:user_dependency,db:async_db_dependency,format_players:List[PlayerValidation]=Body(min_length=1,max_length=MAX_BATCH_SIZE)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
+    rows = [{**format_player.model_dump(),"owner_id":user.get("id")} for format_player in format_players]
+    result = await db.execute(insert(Players).returning(Players.id,sort_by_parameter_order=True),rows)
+    created_ids = result.scalars().all()
+    await db.commit()
+    await player_cache.invalidate(user.get("id"))
+    return [{"index":index,"id":player_id,"status":"created"} for index,player_id in enumerate(created_ids)]
+
+# met à jour plusieurs joueurs en un seul UPDATE ... FROM (VALUES ...) et un seul commit
+@router.put("/batch/update",status_code=status.HTTP_200_OK)
+async def update_players_batch(user:user_dependency,db:async_db_dependency,format_players:List[PlayerBatchUpdate]=Body(min_length=1,max_length=MAX_BATCH_SIZE)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
+    player_ids = [format_player.id for format_player in format_players]
+    if len(set(player_ids)) != len(player_ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail="un même player ne peut apparaître qu'une fois par batch")
+    batch = values(
+        column("id",Integer),column("nom",String),column("classe",String),column("niveau",Integer),column("trophe",ARRAY(String)),column("actif",Boolean),
+        name="batch"
+    ).data([(p.id,p.nom,p.classe,p.niveau,p.trophe,p.actif) for p in format_players])
+    statement = (
+        update(Players)
+        .where(Players.id == batch.c.id)
+        .where(user.get("id")== Players.owner_id)
+        .values(nom=batch.c.nom,classe=batch.c.classe,niveau=batch.c.niveau,trophe=batch.c.trophe,actif=batch.c.actif)
+        .returning(Players.id)
+    )
+    result = await db.execute(statement)
+    updated_ids = set(result.scalars().all())
+    await db.commit()
+    await player_cache.invalidate(user.get("id"))
+    return [{"index":index,"id":player_id,"status":"updated" if player_id in updated_ids else "not_found"} for index,player_id in enumerate(player_ids)]
+
+# supprime plusieurs joueurs en un seul DELETE ... RETURNING et un seul commit
+@router.delete("/batch/delete",status_code=status.HTTP_200_OK)
+async def delete_players_batch(user:user_dependency,db:async_db_dependency,player_ids:List[int]=Body(min_length=1,max_length=MAX_BATCH_SIZE)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="vous n'êtes pas autorisé")
+    result = await db.execute(delete(Players).where(Players.id.in_(player_ids)).where(user.get("id")== Players.owner_id).returning(Players.id))
+    deleted_ids = set(result.scalars().all())
+    await db.commit()
+    await player_cache.invalidate(user.get("id"))
+    return [{"index":index,"id":player_id,"status":"deleted" if player_id in deleted_ids else "not_found"} for index,player_id in enumerate(player_ids)]
\ No newline at end of file
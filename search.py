@@ -0,0 +1,27 @@
+from sqlalchemy import select,func
+from models import Players
+from pagination import PLAYER_FIELDS
+
+# nombre de résultats par défaut et maximal
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# échappe les jokers LIKE saisis par le client
+def escape_like(value:str):
+    return value.replace("\\","\\\\").replace("%","\\%").replace("_","\\_")
+
+# requête de recherche par nom servie par l'index trigramme ix_players_nom_trgm
+# prefix: noms qui commencent par q (les plus courts d'abord), similarity: classés par similarité pg_trgm
+def build_search_query(q:str,*filters,mode:str="prefix",limit:int=DEFAULT_SEARCH_LIMIT):
+    columns = list(PLAYER_FIELDS.values())
+    if mode == "similarity":
+        score = func.similarity(Players.nom,q)
+        statement = select(*columns,score.label("score")).where(Players.nom.op("%")(q),*filters).order_by(score.desc(),Players.id.asc())
+    else:
+        statement = select(*columns).where(Players.nom.ilike(f"{escape_like(q)}%",escape="\\"),*filters).order_by(func.length(Players.nom).asc(),Players.nom.asc(),Players.id.asc())
+    return statement.limit(limit)
+
+async def search_players(db,q:str,*filters,mode:str="prefix",limit:int=DEFAULT_SEARCH_LIMIT):
+    result = await db.execute(build_search_query(q,*filters,mode=mode,limit=limit))
+    keys = tuple(result.keys())
+    return [dict(zip(keys,row)) for row in result.all()]
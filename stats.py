@@ -0,0 +1,70 @@
+from sqlalchemy import select,func
+from models import Players,Users
+from cache import LRUTTLCache
+import asyncio
+import time
+import os
+from dotenv import load_dotenv
+
+# charge les variables d'environnement
+load_dotenv()
+
+# durée de vie des statistiques en cache (secondes)
+ADMIN_STATS_TTL = float(os.getenv("ADMIN_STATS_TTL","10"))
+
+stats_cache = LRUTTLCache(maxsize=1,ttl=ADMIN_STATS_TTL)
+
+# un seul calcul à la fois: les tableaux de bord qui rafraîchissent ensemble attendent le même résultat
+stats_lock = asyncio.Lock()
+
+
+# agrégats calculés par Postgres (GROUP BY, percentiles), rien n'est chargé ligne à ligne
+async def compute_player_stats(db):
+    classes = await db.execute(select(Players.classe,func.count()).group_by(Players.classe).order_by(Players.classe))
+
+    # tranches de 10 niveaux: 1-10, 11-20, ..., 91-100
+    bucket = func.width_bucket(Players.niveau,1,101,10).label("bucket")
+    levels = await db.execute(select(bucket,func.count()).where(Players.niveau.is_not(None)).group_by(bucket).order_by(bucket))
+
+    activity = (await db.execute(select(func.count().filter(Players.actif.is_(True)),func.count()).select_from(Players))).one()
+
+    # joueurs par propriétaire, utilisateurs sans joueur compris
+    per_owner = select(func.count(Players.id).label("players")).select_from(Users).outerjoin(Players,Players.owner_id == Users.id).group_by(Users.id).subquery()
+    owners = (await db.execute(select(
+        func.count(),
+        func.avg(per_owner.c.players),
+        func.percentile_cont(0.5).within_group(per_owner.c.players),
+        func.percentile_cont(0.9).within_group(per_owner.c.players),
+        func.percentile_cont(0.99).within_group(per_owner.c.players),
+        func.max(per_owner.c.players)
+    ))).one()
+
+    active,total = activity
+    return {
+        "total":total,
+        "classes":{classe:count for classe,count in classes.all()},
+        "niveaux":[{"de":(index-1)*10+1,"a":index*10,"joueurs":count} for index,count in levels.all()],
+        "actifs":active,
+        "inactifs":total-active,
+        "ratio_actifs":active/total if total else 0.0,
+        "joueurs_par_proprietaire":{
+            "proprietaires":owners[0],
+            "moyenne":float(owners[1] or 0),
+            "p50":owners[2] or 0,
+            "p90":owners[3] or 0,
+            "p99":owners[4] or 0,
+            "max":owners[5] or 0
+        },
+        "calcule_a":time.time()
+    }
+
+# statistiques en cache pour ADMIN_STATS_TTL secondes
+async def player_stats(db):
+    stats = stats_cache.get("players")
+    if stats is None:
+        async with stats_lock:
+            stats = stats_cache.get("players")
+            if stats is None:
+                stats = await compute_player_stats(db)
+                stats_cache.set("players",stats)
+    return stats
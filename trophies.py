@@ -0,0 +1,36 @@
+from sqlalchemy import select,func,cast,String
+from sqlalchemy.dialects.postgresql import array,ARRAY
+from models import Players,TrophyCounts
+
+# nombre de trophées par filtre, de compteurs par défaut et maximal
+MAX_TROPHY_FILTER = 10
+DEFAULT_TROPHY_COUNTS_LIMIT = 50
+MAX_TROPHY_COUNTS_LIMIT = 500
+
+# filtre servi par l'index GIN ix_players_trophe_gin
+# any: au moins un des trophées (&&), all: tous les trophées (@>)
+# cast en varchar[] (type de la colonne): un ARRAY['T3'] littéral serait un text[], sans opérateur varchar[] && text[]
+def trophy_filter(trophees:list,mode:str="any"):
+    wanted = cast(array(list(dict.fromkeys(trophees)),type_=String),ARRAY(String))
+    return Players.trophe.op("@>")(wanted) if mode == "all" else Players.trophe.op("&&")(wanted)
+
+# compteurs globaux lus dans trophy_counts (index ix_trophy_counts_holders ou clé primaire), sans parcourir Players
+def build_counts_query(trophees:list|None=None,limit:int=DEFAULT_TROPHY_COUNTS_LIMIT):
+    statement = select(TrophyCounts.trophe,TrophyCounts.holders).where(TrophyCounts.holders > 0)
+    if trophees:
+        statement = statement.where(TrophyCounts.trophe.in_(trophees))
+    return statement.order_by(TrophyCounts.holders.desc(),TrophyCounts.trophe.asc()).limit(limit)
+
+# compteurs des joueurs d'un propriétaire: unnest limité à ses lignes (index ix_players_owner_id_id)
+def build_owner_counts_query(owner_id:int,limit:int=DEFAULT_TROPHY_COUNTS_LIMIT):
+    held = select(Players.id,func.unnest(Players.trophe).label("trophe")).where(Players.owner_id == owner_id).distinct().subquery()
+    holders = func.count().label("holders")
+    return select(held.c.trophe,holders).group_by(held.c.trophe).order_by(holders.desc(),held.c.trophe.asc()).limit(limit)
+
+async def trophy_counts(db,trophees:list|None=None,limit:int=DEFAULT_TROPHY_COUNTS_LIMIT):
+    result = await db.execute(build_counts_query(trophees,limit))
+    return [{"trophe":trophe,"holders":holders} for trophe,holders in result.all()]
+
+async def owner_trophy_counts(db,owner_id:int,limit:int=DEFAULT_TROPHY_COUNTS_LIMIT):
+    result = await db.execute(build_owner_counts_query(owner_id,limit))
+    return [{"trophe":trophe,"holders":holders} for trophe,holders in result.all()]